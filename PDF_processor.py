@@ -1,6 +1,8 @@
 import pdfplumber
 import os
 import logging
+import unicodedata
+from config import Config
 
 
 class PDFProcessor:
@@ -32,15 +34,29 @@ class PDFProcessor:
             return text
     
 
+    def _infer_category(self, filename : str) -> str:
+        """
+        Infers the document category from the PDF filename.
+        :param filename: Name of the PDF file.
+        :return: Category name from Config.DOCUMENT_CATEGORIES, or the default category.
+        """
+        normalized = unicodedata.normalize('NFC', filename).lower().replace('_', ' ')
+        for category, keywords in Config.DOCUMENT_CATEGORIES:
+            if any(keyword in normalized for keyword in keywords):
+                return category
+        return Config.DEFAULT_DOCUMENT_CATEGORY
+
+
     def _extract_metadata_from_pdf(self, pdf_path : str) -> dict:
         """
         Extracts simplified metadata from a PDF file.
         :param pdf_path: Path to the PDF file.
-        :return: Dictionary with filename and creation date (if available).
+        :return: Dictionary with filename, category and creation date (if available).
         """
         filename = os.path.basename(pdf_path)  
         result_metadata = {
-            'filename': filename
+            'filename': filename,
+            'category': self._infer_category(filename)
         }
         try:
             if not os.path.exists(pdf_path):
@@ -1,6 +1,9 @@
 from models import ChatRequest,ChatResponse
 from fastapi import FastAPI, HTTPException,UploadFile,File
 from RAG_service import RAGService
+from llm_client import LLMUnavailableError
+from admission_controller import AdmissionRejectedError
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 import tempfile
 import shutil
@@ -59,16 +62,27 @@ async def chat(request: ChatRequest):
     Handle chat requests from the user.
     
     Args:
-        request (ChatRequest): The user's chat request containing the prompt and context.
+        request (ChatRequest): The user's chat request containing the prompt, context, optional metadata filters
+            and whether to skip the LLM and return the retrieved chunks only.
         
     Returns:
         ChatResponse: The chatbot's response.
     """
     try:
-        response = service.query_llm(request.user_prompt, request.context)
+        filters = request.filters.dict(exclude_none=True) if request.filters else None
+        # Run in the threadpool so a slow LLM call does not block the event loop
+        response = await run_in_threadpool(
+            service.query_llm, request.user_prompt, request.context, filters,
+            retrieval_only=request.retrieval_only
+        )
         
         return ChatResponse(response=response)
     
+    except AdmissionRejectedError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except LLMUnavailableError as e:
+        headers = {"Retry-After": str(max(1, round(e.retry_after)))} if e.retry_after else None
+        raise HTTPException(status_code=503, detail=str(e), headers=headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -1,46 +1,155 @@
 from  vector_store_manager import VectorStoreManager
-from llm_client import LLMClient
+from llm_client import LLMClient, LLMUnavailableError
+from deadline import Deadline
+from admission_controller import AdmissionController
 from prompt_templates import create_reformulation_prompt,create_query_prompt
 from PDF_processor import PDFProcessor
 from document_generator import DocumentGenerator
 from config import Config
 from langchain_huggingface import HuggingFaceEmbeddings
+from collections import OrderedDict
+import json
+import logging
+import threading
+import time
 
 class RAGService : 
     def __init__(self):
+        self.logger = logging.getLogger(__name__)
         self.vector_store_manager = VectorStoreManager(embedding_model=HuggingFaceEmbeddings(
             model_name=Config.MODEL_NAME,
             model_kwargs={'device': Config.DEVICE},
             encode_kwargs={'normalize_embeddings': True}
             )
         )
-        self.llm_client = LLMClient("https://hot-rats-sit.loca.lt")
+        self.llm_client = LLMClient(Config.LLM_URL)
         self.pdf_processor = PDFProcessor("knowledge_base_creation/pdfs")
         self.document_generator = DocumentGenerator()
+        self.admission_controller = AdmissionController(
+            max_concurrency=Config.LLM_MAX_CONCURRENT_REQUESTS,
+            max_queue=Config.LLM_MAX_QUEUED_REQUESTS,
+            queue_timeout=Config.LLM_QUEUE_TIMEOUT_SECONDS,
+            initial_service_time=Config.LLM_INITIAL_SERVICE_TIME_SECONDS
+        )
+        self._answer_cache = OrderedDict()
+        self._answer_cache_lock = threading.Lock()
 
     
-    def query_llm(self, user_prompt: str,context : str) -> str:
+    def query_llm(self, user_prompt: str,context : str, filters: dict = None, deadline: Deadline = None,
+                  retrieval_only: bool = False) -> str:
         """
         Query the LLM with a given question and return the answer.
         
+        Cached answers and retrieval-only requests are served without waiting for the LLM;
+        everything else goes through the admission controller.
+        
         Args:
             query (str): The question to ask the LLM.
+            filters (dict): Optional metadata filters restricting which chunks are retrieved.
+            deadline (Deadline): End-to-end budget shared by the queue wait and both LLM calls.
+                Defaults to Config.CHAT_DEADLINE_SECONDS.
+            retrieval_only (bool): Return the retrieved chunks without calling the LLM.
             
         Returns:
             str: The answer from the LLM.
+
+        Raises:
+            AdmissionRejectedError: If the LLM queue is full or no slot frees up in time.
+            LLMUnavailableError: If the LLM cannot answer within the deadline.
         """
-        try:
-            reformalation_prompt = create_reformulation_prompt(user_prompt)
-            reformulated_user_prompt = self.llm_client.get_response(reformalation_prompt)
-            # Search for relevant documents in the vector store
-            documents = self.vector_store_manager.search_documents(reformulated_user_prompt, k=5)
-            llm_prompt = create_query_prompt(user_prompt, documents)
-            response = self.llm_client.get_response(llm_prompt)
+        if deadline is None:
+            deadline = Deadline(Config.CHAT_DEADLINE_SECONDS)
+
+        cache_key = json.dumps([user_prompt, context, filters, retrieval_only], sort_keys=True, default=str)
+        cached_response = self._get_cached_answer(cache_key)
+        if cached_response is not None:
+            return cached_response
+
+        if retrieval_only:
+            documents = self.vector_store_manager.search_documents(user_prompt, k=5, filters=filters)
+            response = "\n\n".join(doc.page_content for doc in documents)
+            self._cache_answer(cache_key, response)
             return response
-        except Exception as e:
-            print(f"Error querying LLM: {e}")
-            return "An error occurred while querying the LLM."
+
+        with self.admission_controller.admit(deadline):
+            try:
+                reformulated_user_prompt = self._reformulate(user_prompt, deadline)
+                # Search for relevant documents in the vector store
+                documents = self.vector_store_manager.search_documents(reformulated_user_prompt, k=5, filters=filters)
+                llm_prompt = create_query_prompt(user_prompt, context, documents)
+                response = self.llm_client.get_response(llm_prompt, deadline)
+            except LLMUnavailableError:
+                raise
+            except Exception as e:
+                print(f"Error querying LLM: {e}")
+                return "An error occurred while querying the LLM."
+        self._cache_answer(cache_key, response)
+        return response
+        
+
+    def _get_cached_answer(self, cache_key: str):
+        """
+        Look up a previous answer for the same prompt, context and filters.
+        
+        Args:
+            cache_key (str): Serialized request.
+            
+        Returns:
+            str: The cached answer, or None if missing or expired.
+        """
+        with self._answer_cache_lock:
+            entry = self._answer_cache.get(cache_key)
+            if entry is None:
+                return None
+            response, stored_at = entry
+            if time.monotonic() - stored_at > Config.ANSWER_CACHE_TTL_SECONDS:
+                del self._answer_cache[cache_key]
+                return None
+            self._answer_cache.move_to_end(cache_key)
+            return response
+
+    def _cache_answer(self, cache_key: str, response: str):
+        """
+        Store an answer, evicting the least recently used one when the cache is full.
+        
+        Args:
+            cache_key (str): Serialized request.
+            response (str): The answer to cache.
+        """
+        if not response:
+            return
+        with self._answer_cache_lock:
+            self._answer_cache[cache_key] = (response, time.monotonic())
+            self._answer_cache.move_to_end(cache_key)
+            while len(self._answer_cache) > Config.ANSWER_CACHE_SIZE:
+                self._answer_cache.popitem(last=False)
+
+    def _clear_answer_cache(self):
+        """Drop cached answers after the knowledge base changes."""
+        with self._answer_cache_lock:
+            self._answer_cache.clear()
+
+
+    def _reformulate(self, user_prompt: str, deadline: Deadline) -> str:
+        """
+        Ask the LLM to correct the user prompt, falling back to the original prompt on failure.
         
+        Args:
+            user_prompt (str): The raw user prompt.
+            deadline (Deadline): The chat deadline; reformulation only gets a fraction of it.
+            
+        Returns:
+            str: The reformulated prompt, or the original one.
+        """
+        reformulation_deadline = Deadline(deadline.remaining() * Config.REFORMULATION_DEADLINE_FRACTION)
+        try:
+            reformulated = self.llm_client.get_response(
+                create_reformulation_prompt(user_prompt), reformulation_deadline
+            )
+        except LLMUnavailableError as e:
+            self.logger.warning(f"Reformulation skipped: {e}")
+            return user_prompt
+        return reformulated.strip() or user_prompt
 
     def add_pdf(self, file_path: str):
         """
@@ -52,7 +161,8 @@ class RAGService :
         try:
             result = self.pdf_processor.process_pdf(file_path)
             docs = self.document_generator.generate_documents(result['text'],result['metadata'])
-            self.vector_store_manager.add_documents(docs,file_path)
+            self.vector_store_manager.add_documents(docs,result['metadata']['filename'])
+            self._clear_answer_cache()
         except Exception as e:
             print(f"Error processing PDF: {e}")
 
@@ -65,6 +175,7 @@ class RAGService :
         """
         try:
             self.vector_store_manager.delete_documents(filename)
+            self._clear_answer_cache()
         except Exception as e:
             print(f"Error deleting PDF: {e}")
 
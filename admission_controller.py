@@ -0,0 +1,100 @@
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from deadline import Deadline
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a request is shed instead of being queued or served."""
+
+    def __init__(self, message: str, status_code: int, retry_after: float):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with a bounded wait queue.
+
+    At most `max_concurrency` requests run at once and at most `max_queue` wait for a slot.
+    Requests arriving when the queue is full are rejected right away (429), and queued
+    requests that do not get a slot within their queue deadline are rejected (503).
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float, initial_service_time: float):
+        """
+        Initialize the admission controller.
+
+        Args:
+            max_concurrency: Maximum number of requests served at once
+            max_queue: Maximum number of requests waiting for a slot
+            queue_timeout: Longest time a request may wait for a slot, in seconds
+            initial_service_time: Service time estimate used for Retry-After until real samples exist
+        """
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.logger = logging.getLogger(__name__)
+        self._condition = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._avg_service_time = initial_service_time
+
+    @contextmanager
+    def admit(self, deadline: Deadline = None):
+        """
+        Hold a slot for the duration of the `with` block.
+
+        Args:
+            deadline: Request deadline; the queue wait never outlasts it
+
+        Raises:
+            AdmissionRejectedError: If the queue is full or no slot frees up in time
+        """
+        self._acquire(deadline)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - start)
+
+    def retry_after(self) -> int:
+        """Estimated seconds until the current backlog drains."""
+        backlog = self._waiting + 1
+        return max(1, math.ceil(self._avg_service_time * backlog / self.max_concurrency))
+
+    def _acquire(self, deadline: Deadline):
+        timeout = deadline.cap(self.queue_timeout) if deadline else self.queue_timeout
+        with self._condition:
+            # Only bypass the queue when nobody is already waiting
+            if self._active < self.max_concurrency and self._waiting == 0:
+                self._active += 1
+                return
+            if self._waiting >= self.max_queue:
+                self.logger.warning(f"Shedding request: {self._active} active, {self._waiting} queued")
+                raise AdmissionRejectedError("Server is busy, please retry later", 429, self.retry_after())
+
+            self._waiting += 1
+            try:
+                expires_at = time.monotonic() + timeout
+                while self._active >= self.max_concurrency:
+                    remaining = expires_at - time.monotonic()
+                    if remaining <= 0:
+                        self.logger.warning(f"Request timed out after waiting {timeout:.1f}s for a slot")
+                        raise AdmissionRejectedError(
+                            "Timed out waiting for the language model", 503, self.retry_after()
+                        )
+                    self._condition.wait(remaining)
+                self._active += 1
+            finally:
+                self._waiting -= 1
+
+    def _release(self, service_time: float):
+        with self._condition:
+            self._active -= 1
+            # Exponentially weighted average keeps Retry-After in line with recent load
+            self._avg_service_time = 0.8 * self._avg_service_time + 0.2 * service_time
+            self._condition.notify()
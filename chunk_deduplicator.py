@@ -0,0 +1,92 @@
+import hashlib
+import logging
+import uuid
+from typing import Dict, List, Tuple
+from langchain.docstore.document import Document
+
+
+class ChunkDeduplicator:
+    """
+    Detects exact duplicate chunks at ingestion time.
+
+    Chunks are matched on a hash of their whitespace-normalized text, within a file as well as
+    across files and re-uploads: the chunk is stored once and every file containing it references
+    the same entry. Near duplicates are deliberately kept apart, because the few words that differ
+    ("avec frais" / "sans frais") are often exactly what users ask about.
+    """
+
+    def __init__(self, hashes: List[Tuple[str, str]] = None):
+        """
+        Initialize the deduplicator.
+
+        Args:
+            hashes: Previously stored (document ID, content hash) records
+        """
+        self.logger = logging.getLogger(__name__)
+        self.doc_id_by_hash: Dict[str, str] = {}
+        self.hashes: Dict[str, str] = {}
+
+        self.chunks_seen = 0
+        self.duplicates = 0
+
+        for doc_id, content_hash in hashes or []:
+            self._register(doc_id, content_hash)
+        self.logger.debug(f"Loaded {len(self.hashes)} chunk hashes")
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        """Hash of the whitespace-normalized chunk text."""
+        return hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+    def _register(self, doc_id: str, content_hash: str):
+        self.doc_id_by_hash.setdefault(content_hash, doc_id)
+        self.hashes[doc_id] = content_hash
+
+    def deduplicate(self, documents: List[Document]) -> Tuple[List[Document], List[str], List[Tuple[str, str]]]:
+        """
+        Split documents into new chunks and duplicates of already indexed (or earlier) chunks.
+
+        New chunks are registered immediately so duplicates within the same batch are caught;
+        call `remove` with their IDs if they end up not being indexed.
+
+        Args:
+            documents: Chunks about to be indexed
+
+        Returns:
+            Tuple of (new documents, document IDs of all chunks in order including reused ones,
+            hash records to persist for the new documents)
+        """
+        new_documents = []
+        doc_ids = []
+        records = []
+        for doc in documents:
+            self.chunks_seen += 1
+            content_hash = self.content_hash(doc.page_content)
+            existing_id = self.doc_id_by_hash.get(content_hash)
+            if existing_id:
+                self.duplicates += 1
+                doc_ids.append(existing_id)
+                continue
+
+            doc_id = doc.metadata.setdefault('document_id', str(uuid.uuid4()))
+            self._register(doc_id, content_hash)
+            new_documents.append(doc)
+            doc_ids.append(doc_id)
+            records.append((doc_id, content_hash))
+
+        return new_documents, doc_ids, records
+
+    def remove(self, doc_ids: List[str]):
+        """Forget chunks that were removed from (or never made it into) the index."""
+        for doc_id in doc_ids:
+            content_hash = self.hashes.pop(doc_id, None)
+            if content_hash and self.doc_id_by_hash.get(content_hash) == doc_id:
+                del self.doc_id_by_hash[content_hash]
+
+    def stats(self) -> Dict[str, float]:
+        """Counts of chunks seen and merged as duplicates since startup."""
+        return {
+            'chunks_seen': self.chunks_seen,
+            'duplicates': self.duplicates,
+            'reduction_percent': 100.0 * self.duplicates / self.chunks_seen if self.chunks_seen else 0.0,
+        }
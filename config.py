@@ -6,4 +6,40 @@ class Config:
     DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
     CHUNK_SIZE = 1000
     CHUNK_OVERLAP = 200
-    VECTOR_STORE_PATH = "vector_store"
\ No newline at end of file
+    VECTOR_STORE_PATH = "vector_store"
+    # Keyword -> category rules applied to PDF filenames (first match wins)
+    DOCUMENT_CATEGORIES = [
+        ("guide", ["guide"]),
+        ("service", ["service"]),
+        ("department", ["department", "département"]),
+        ("procedure", ["procédure", "procedure", "composition"]),
+        ("research", ["laboratoire", "recherche", "doctorale"]),
+        ("curriculum", ["plan d", "syllabus", "licence"]),
+    ]
+    DEFAULT_DOCUMENT_CATEGORY = "general"
+
+    # LLM backend and tail-latency controls
+    LLM_URL = "https://hot-rats-sit.loca.lt"
+    CHAT_DEADLINE_SECONDS = 60.0  # End-to-end budget shared by both LLM calls of a chat
+    LLM_REQUEST_TIMEOUT_SECONDS = 45.0  # Upper bound for a single HTTP attempt
+    LLM_MAX_RETRIES = 2
+    LLM_RETRY_BASE_DELAY_SECONDS = 0.5  # Full-jitter exponential backoff base
+    LLM_RETRY_MAX_DELAY_SECONDS = 4.0
+    LLM_HEDGING_ENABLED = False
+    LLM_HEDGE_PERCENTILE = 0.95  # Send a hedged request once the primary exceeds this latency percentile
+    LLM_HEDGE_MIN_SAMPLES = 20  # Latency samples required before hedging kicks in
+    LLM_LATENCY_WINDOW = 200
+    LLM_BREAKER_FAILURE_THRESHOLD = 5  # Consecutive failures that open the circuit
+    LLM_BREAKER_RESET_SECONDS = 30.0  # Time before a half-open probe is allowed
+    REFORMULATION_DEADLINE_FRACTION = 0.3  # Share of the chat deadline the reformulation call may use
+    SEGMENT_MERGE_THRESHOLD = 32  # Pending segments that trigger a background merge into a new base snapshot
+    EMBEDDING_CACHE_PATH = "embedding_cache"
+    EMBEDDING_CACHE_MAX_ENTRIES = 100000
+
+    # Admission control for /chat
+    LLM_MAX_CONCURRENT_REQUESTS = 4  # Chats allowed to use the LLM at once
+    LLM_MAX_QUEUED_REQUESTS = 16  # Chats allowed to wait for a slot; beyond that requests get 429
+    LLM_QUEUE_TIMEOUT_SECONDS = 10.0  # Longest queue wait before a 503
+    LLM_INITIAL_SERVICE_TIME_SECONDS = 5.0  # Service time estimate for Retry-After before real samples
+    ANSWER_CACHE_SIZE = 256
+    ANSWER_CACHE_TTL_SECONDS = 600.0
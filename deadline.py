@@ -0,0 +1,30 @@
+import time
+from typing import Optional
+
+
+class Deadline:
+    """
+    An absolute point in time by which a piece of work must finish.
+    Created once per request and passed down so every step shares the same budget.
+    """
+
+    def __init__(self, timeout_seconds: float):
+        """
+        Args:
+            timeout_seconds: Budget in seconds, starting now
+        """
+        self.expires_at = time.monotonic() + timeout_seconds
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline, never negative."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        """Whether the deadline has passed."""
+        return self.remaining() <= 0
+
+    def cap(self, timeout_seconds: Optional[float]) -> float:
+        """Return the given timeout, shortened to fit within the deadline."""
+        if timeout_seconds is None:
+            return self.remaining()
+        return min(timeout_seconds, self.remaining())
@@ -67,7 +67,7 @@ class DocumentGenerator:
             documents = []
             for chunk in chunks:
                 try:
-                    documents.append(Document(page_content=chunk, metadata=metadata))
+                    documents.append(Document(page_content=chunk, metadata=dict(metadata)))
                 except Exception as e:
                     self.logger.error(f"Error creating document from chunk: {e}")
             
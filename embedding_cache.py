@@ -0,0 +1,272 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+from typing import List, Optional
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed cache of chunk embeddings.
+
+    Vectors are stored in a memory-mapped float32 file, one row per entry. A SQLite
+    table maps each key (hash of model name and normalized chunk text) to its row, last
+    use time and a checksum of the vector. Once `max_entries` rows are used, the least
+    recently used entries are evicted and their rows reused. Reads verify the checksum,
+    so a row overwritten by a crashed or concurrent writer is treated as a miss.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, max_entries: int):
+        """
+        Initialize the embedding cache.
+
+        Args:
+            cache_dir: Directory holding the SQLite index and the vector file
+            model_name: Name of the embedding model, part of every key
+            max_entries: Maximum number of cached embeddings
+        """
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.db_path = os.path.join(cache_dir, "index.db")
+        self.vectors_path = os.path.join(cache_dir, "vectors.f32")
+        self.logger = logging.getLogger(__name__)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._vectors = None
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._initialize_db()
+        dimension = self._get_meta("dimension")
+        self.dimension = int(dimension) if dimension else None
+        if self.dimension:
+            self._open_vectors()
+
+    def _initialize_db(self):
+        """Initialize the SQLite tables for the key index and cache metadata."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    slot INTEGER UNIQUE NOT NULL,
+                    last_used REAL NOT NULL,
+                    checksum INTEGER
+                )
+                ''')
+                columns = [row[1] for row in cursor.execute("PRAGMA table_info(embeddings)")]
+                if 'checksum' not in columns:
+                    # Rows written before checksums existed fail verification and are re-embedded
+                    cursor.execute("ALTER TABLE embeddings ADD COLUMN checksum INTEGER")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cache_meta (
+                    name TEXT PRIMARY KEY,
+                    value TEXT
+                )
+                ''')
+                conn.commit()
+            self.logger.info(f"Initialized embedding cache at {self.db_path}")
+        except Exception as e:
+            self.logger.error(f"Failed to initialize embedding cache: {e}")
+            raise
+
+    def _get_meta(self, name: str) -> Optional[str]:
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute("SELECT value FROM cache_meta WHERE name = ?", (name,)).fetchone()
+            return row[0] if row else None
+
+    def _set_meta(self, name: str, value: str):
+        """Set a metadata value unless another writer already set it."""
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            conn.execute("INSERT OR IGNORE INTO cache_meta (name, value) VALUES (?, ?)", (name, value))
+            conn.commit()
+
+    @staticmethod
+    def _checksum(vector: np.ndarray) -> int:
+        return zlib.crc32(np.ascontiguousarray(vector, dtype=np.float32).tobytes())
+
+    def _row_is_valid(self, slot: int, checksum: Optional[int]) -> bool:
+        """Whether the vector row still holds the data its key was stored with."""
+        if checksum is None or slot >= self._capacity():
+            return False
+        return self._checksum(self._vectors[slot]) == checksum
+
+    def _open_vectors(self):
+        """Memory-map the vector file, if it holds any rows."""
+        self._vectors = None
+        row_bytes = self.dimension * np.dtype(np.float32).itemsize
+        size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        rows = size // row_bytes
+        if rows:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(rows, self.dimension))
+
+    def _capacity(self) -> int:
+        return 0 if self._vectors is None else self._vectors.shape[0]
+
+    def _ensure_capacity(self, rows: int):
+        """
+        Grow the vector file geometrically so it holds at least `rows` rows.
+
+        Must be called inside the write transaction, so no other process resizes the file concurrently.
+        """
+        if rows <= self._capacity():
+            return
+        # Another process may have grown the file already
+        self._open_vectors()
+        if rows <= self._capacity():
+            return
+        new_rows = min(self.max_entries, max(rows, 2 * self._capacity(), 1024))
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(new_rows * self.dimension * np.dtype(np.float32).itemsize)
+        self._open_vectors()
+
+    def make_key(self, text: str) -> str:
+        """Hash the model name and the whitespace/unicode-normalized chunk text."""
+        normalized = " ".join(unicodedata.normalize("NFC", text).split())
+        return hashlib.sha256(f"{self.model_name}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up cached embeddings.
+
+        Args:
+            texts: Chunk texts
+
+        Returns:
+            One vector per text, or None where the text is not cached
+        """
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        if not texts:
+            return results
+        if self.dimension is None:
+            dimension = self._get_meta("dimension")
+            if not dimension:
+                self.misses += len(texts)
+                return results
+            self.dimension = int(dimension)
+
+        keys = [self.make_key(text) for text in texts]
+        with self._lock, sqlite3.connect(self.db_path, timeout=30) as conn:
+            entries = {}
+            unique_keys = list(set(keys))
+            for start in range(0, len(unique_keys), 500):
+                batch = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                for key, slot, checksum in conn.execute(
+                    f"SELECT key, slot, checksum FROM embeddings WHERE key IN ({placeholders})", batch
+                ):
+                    entries[key] = (slot, checksum)
+            if entries and max(slot for slot, _ in entries.values()) >= self._capacity():
+                # Another process grew the vector file
+                self._open_vectors()
+
+            vectors = {}
+            for key, (slot, checksum) in entries.items():
+                if self._row_is_valid(slot, checksum):
+                    vectors[key] = np.array(self._vectors[slot])
+            if vectors:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in vectors]
+                )
+                conn.commit()
+            for i, key in enumerate(keys):
+                if key in vectors:
+                    results[i] = vectors[key].copy()
+
+        hits = sum(1 for vector in results if vector is not None)
+        self.hits += hits
+        self.misses += len(texts) - hits
+        return results
+
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        """
+        Store embeddings, evicting the least recently used entries when the cache is full.
+
+        Slot assignment, row writes and key inserts happen in one `BEGIN IMMEDIATE` transaction,
+        which SQLite serializes across processes, so two writers never claim the same row.
+
+        Args:
+            texts: Chunk texts
+            vectors: Embeddings, one row per text
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(texts):
+            return
+
+        with self._lock:
+            if self.dimension is None:
+                self._set_meta("dimension", str(vectors.shape[1]))
+                self.dimension = int(self._get_meta("dimension"))
+            if vectors.shape[1] != self.dimension:
+                self.logger.warning(
+                    f"Embedding dimension changed from {self.dimension} to {vectors.shape[1]}, skipping cache write"
+                )
+                return
+
+            new_entries = {}
+            for text, vector in zip(texts, vectors):
+                new_entries.setdefault(self.make_key(text), vector)
+
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                self._open_vectors()
+                entries = []
+                for key, vector in new_entries.items():
+                    row = conn.execute("SELECT slot, checksum FROM embeddings WHERE key = ?", (key,)).fetchone()
+                    if row is not None and self._row_is_valid(*row):
+                        continue
+                    if row is not None:
+                        # Damaged or pre-checksum row: free it and store the vector again
+                        conn.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+                    entries.append((key, vector))
+                entries = entries[-self.max_entries:]
+                if not entries:
+                    conn.execute("COMMIT")
+                    return
+
+                taken = {row[0] for row in conn.execute("SELECT slot FROM embeddings")}
+                slots = []
+                for slot in range(self.max_entries):
+                    if len(slots) == len(entries):
+                        break
+                    if slot not in taken:
+                        slots.append(slot)
+                evict_count = len(entries) - len(slots)
+                if evict_count:
+                    evicted = conn.execute(
+                        "SELECT key, slot FROM embeddings ORDER BY last_used LIMIT ?", (evict_count,)
+                    ).fetchall()
+                    conn.executemany("DELETE FROM embeddings WHERE key = ?", [(key,) for key, _ in evicted])
+                    slots.extend(slot for _, slot in evicted)
+                    self.logger.debug(f"Evicted {len(evicted)} embeddings from cache")
+
+                self._ensure_capacity(max(slots) + 1)
+                for slot, (_, vector) in zip(slots, entries):
+                    self._vectors[slot] = vector
+                self._vectors.flush()
+
+                now = time.time()
+                conn.executemany(
+                    "INSERT INTO embeddings (key, slot, last_used, checksum) VALUES (?, ?, ?, ?)",
+                    [(key, slot, now, self._checksum(vector)) for slot, (key, vector) in zip(slots, entries)]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
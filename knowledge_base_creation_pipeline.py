@@ -48,6 +48,14 @@ class KnowledgeBaseCreationPipeline:
                 self.logger.info(f"Successfully created embeddings for {pdffile}.")
                 self.logger.info(f"Stored document IDs for {pdffile} in local storage.")
                 self.logger.info(f"Stored {len(documents)} documents for {pdffile} in the vector store.")
-                self.vector_store_manager.persist_vector_store()
+        # Each addition was logged as a segment; fold them into a single base snapshot
+        self.vector_store_manager.persist_vector_store()
+        cache = self.vector_store_manager.embedding_cache
+        self.logger.info(f"Embedding cache: {cache.hits} chunks reused, {cache.misses} chunks embedded.")
+        stats = self.vector_store_manager.deduplicator.stats()
+        self.logger.info(
+            f"Deduplication: {stats['duplicates']} duplicate chunks merged out of {stats['chunks_seen']} chunks, "
+            f"index shrank by {stats['reduction_percent']:.1f}%."
+        )
 
 
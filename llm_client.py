@@ -1,28 +1,179 @@
-import requests 
+import logging
+import math
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import requests
+from circuit_breaker import CircuitBreaker
+from config import Config
+from deadline import Deadline
 
 
-class LLMClient : 
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class LLMUnavailableError(Exception):
+    """Raised when the LLM cannot produce a response within the request deadline."""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMClient :
     def __init__(self, llm_url):
         self.llm_url = llm_url
+        self.logger = logging.getLogger(__name__)
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=Config.LLM_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=Config.LLM_BREAKER_RESET_SECONDS,
+            name="llm"
+        )
+        self._latencies = deque(maxlen=Config.LLM_LATENCY_WINDOW)
+        self._latency_lock = threading.Lock()
+        # Every admitted chat needs at most a primary and a hedge at a time
+        self._hedge_workers = 2 * Config.LLM_MAX_CONCURRENT_REQUESTS
+        self._hedge_in_flight = 0
+        self._hedge_executor = (
+            ThreadPoolExecutor(max_workers=self._hedge_workers, thread_name_prefix="llm-hedge")
+            if Config.LLM_HEDGING_ENABLED else None
+        )
 
-    def get_response(self, prompt):
+    def get_response(self, prompt, deadline: Deadline = None):
         """
         Send a prompt to the LLM and get the response.
-        
+
+        Failed attempts are retried with jittered exponential backoff while the deadline allows.
+
         Args:
             prompt (str): The prompt to send to the LLM.
-            context (str): The context of the query.
-            
+            deadline (Deadline): Time budget shared with the rest of the request.
+                Defaults to a fresh Config.CHAT_DEADLINE_SECONDS budget.
+
         Returns:
             str: The response from the LLM.
+
+        Raises:
+            LLMUnavailableError: If the circuit is open, the deadline expires or retries are exhausted.
         """
+        if deadline is None:
+            deadline = Deadline(Config.CHAT_DEADLINE_SECONDS)
+
+        last_error = None
+        for attempt in range(Config.LLM_MAX_RETRIES + 1):
+            if deadline.expired():
+                break
+            if not self.circuit_breaker.allow_request():
+                raise LLMUnavailableError(
+                    "LLM host is unavailable (circuit open)",
+                    retry_after=self.circuit_breaker.retry_after()
+                )
+            try:
+                response = self._send(prompt, deadline)
+                self.circuit_breaker.record_success()
+                return response
+            except requests.RequestException as e:
+                last_error = e
+                if not self._is_retryable(e):
+                    # The host answered, so it is up; the request itself was rejected
+                    self.circuit_breaker.record_success()
+                    raise LLMUnavailableError(f"LLM rejected the request: {e}") from e
+                self.circuit_breaker.record_failure()
+                self.logger.warning(f"LLM attempt {attempt + 1} failed: {e}")
+                if attempt < Config.LLM_MAX_RETRIES:
+                    time.sleep(min(self._backoff_delay(attempt), deadline.remaining()))
+            except Exception as e:
+                # Anything else (e.g. a malformed body) still has to settle a half-open probe
+                self.circuit_breaker.record_failure()
+                raise LLMUnavailableError(f"Unexpected response from LLM: {e}") from e
+
+        raise LLMUnavailableError(
+            f"LLM did not respond within the deadline: {last_error or 'deadline expired'}",
+            retry_after=self.circuit_breaker.retry_after()
+        )
+
+    def _send(self, prompt: str, deadline: Deadline) -> str:
+        """Run one attempt, hedging it with a second request if it is slower than usual."""
+        timeout = deadline.cap(Config.LLM_REQUEST_TIMEOUT_SECONDS)
+        hedge_delay = self._hedge_delay()
+        # Hedging needs two free workers; stuck requests must not make new chats queue behind them
+        if hedge_delay is None or hedge_delay >= timeout or not self._reserve_hedge_workers(2):
+            return self._post(prompt, timeout)
+
+        pending = {self._submit_reserved(prompt, timeout)}
         try:
-            response = requests.post(self.llm_url+"/response", json={"prompt": prompt})
-            response.raise_for_status()
-            return response.json().get("response", "")
-        except requests.RequestException as e:
-            print(f"Error contacting LLM: {e}")
-            return ""
-        
-
-        
+            done, pending = wait(pending, timeout=hedge_delay)
+            if done:
+                self._release_hedge_workers(1)
+                return done.pop().result()
+
+            self.logger.debug(f"LLM request slower than {hedge_delay:.2f}s, sending hedged request")
+            pending.add(self._submit_reserved(prompt, deadline.cap(Config.LLM_REQUEST_TIMEOUT_SECONDS)))
+            error = None
+            while pending:
+                done, pending = wait(pending, timeout=deadline.remaining(), return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    try:
+                        return future.result()
+                    except requests.RequestException as e:
+                        error = e
+            raise error or requests.Timeout("LLM request exceeded the deadline")
+        finally:
+            # Running requests cannot be interrupted, but queued ones must not start after we gave up
+            for future in pending:
+                future.cancel()
+
+    def _reserve_hedge_workers(self, count: int) -> bool:
+        with self._latency_lock:
+            if self._hedge_in_flight + count > self._hedge_workers:
+                return False
+            self._hedge_in_flight += count
+            return True
+
+    def _release_hedge_workers(self, count: int):
+        with self._latency_lock:
+            self._hedge_in_flight -= count
+
+    def _submit_reserved(self, prompt: str, timeout: float):
+        """Submit a request on a worker reserved by `_reserve_hedge_workers`, freeing it when done."""
+        future = self._hedge_executor.submit(self._post, prompt, timeout)
+        future.add_done_callback(lambda _: self._release_hedge_workers(1))
+        return future
+
+    def _post(self, prompt: str, timeout: float) -> str:
+        """Send a single HTTP request to the LLM and record its latency."""
+        start = time.monotonic()
+        response = requests.post(self.llm_url+"/response", json={"prompt": prompt}, timeout=timeout)
+        response.raise_for_status()
+        text = response.json().get("response", "")
+        with self._latency_lock:
+            self._latencies.append(time.monotonic() - start)
+        return text
+
+    def _hedge_delay(self):
+        """Latency percentile after which a hedged request is sent, or None if hedging is off."""
+        if self._hedge_executor is None:
+            return None
+        with self._latency_lock:
+            if len(self._latencies) < Config.LLM_HEDGE_MIN_SAMPLES:
+                return None
+            latencies = sorted(self._latencies)
+        index = min(len(latencies) - 1, math.ceil(Config.LLM_HEDGE_PERCENTILE * len(latencies)) - 1)
+        return latencies[index]
+
+    @staticmethod
+    def _is_retryable(error: requests.RequestException) -> bool:
+        """Connection errors, timeouts and overload/server status codes are worth retrying."""
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            return error.response.status_code in RETRYABLE_STATUS_CODES
+        return True
+
+    @staticmethod
+    def _backoff_delay(attempt: int) -> float:
+        """Full-jitter exponential backoff."""
+        cap = min(Config.LLM_RETRY_MAX_DELAY_SECONDS, Config.LLM_RETRY_BASE_DELAY_SECONDS * (2 ** attempt))
+        return random.uniform(0, cap)
@@ -1,13 +1,14 @@
 import sqlite3
 import json
 import logging
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 
 class LocalStorageManager:
     """
     Manages local storage for document mappings using SQLite.
-    Maps filenames to document IDs for efficient retrieval and deletion.
+    Maps filenames to document IDs for efficient retrieval and deletion, and keeps
+    the chunk content hashes and per-file references used for deduplication.
     """
     
     def __init__(self, db_path: str = "document_index.db"):
@@ -32,6 +33,33 @@ class LocalStorageManager:
                     document_ids TEXT
                 )
                 ''')
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS chunk_hashes (
+                    document_id TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL
+                )
+                ''')
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_chunk_hashes_content_hash ON chunk_hashes (content_hash)")
+                # Databases written while near duplicates were tracked with MinHash signatures
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chunk_signatures'")
+                if cursor.fetchone():
+                    cursor.execute("INSERT OR IGNORE INTO chunk_hashes SELECT document_id, content_hash FROM chunk_signatures")
+                    cursor.execute("DROP TABLE chunk_signatures")
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS chunk_references (
+                    document_id TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    category TEXT,
+                    creation_date TEXT,
+                    PRIMARY KEY (document_id, filename)
+                )
+                ''')
+                # Databases created before references carried file metadata
+                columns = [row[1] for row in cursor.execute("PRAGMA table_info(chunk_references)")]
+                for column in ("category", "creation_date"):
+                    if column not in columns:
+                        cursor.execute(f"ALTER TABLE chunk_references ADD COLUMN {column} TEXT")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_chunk_references_filename ON chunk_references (filename)")
                 conn.commit()
             self.logger.info(f"Initialized document mapping database at {self.db_path}")
         except Exception as e:
@@ -142,4 +170,160 @@ class LocalStorageManager:
                 self.logger.info("Cleared all document mappings")
         except Exception as e:
             self.logger.error(f"Error clearing document mappings: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    def store_chunk_hashes(self, hashes: List[Tuple[str, str]]):
+        """
+        Store content hashes for newly indexed chunks.
+        
+        Args:
+            hashes: List of (document ID, content hash)
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO chunk_hashes (document_id, content_hash) VALUES (?, ?)",
+                    hashes
+                )
+                conn.commit()
+                self.logger.debug(f"Stored {len(hashes)} chunk hashes")
+        except Exception as e:
+            self.logger.error(f"Error storing chunk hashes: {e}")
+            raise
+    
+    def get_all_chunk_hashes(self) -> List[Tuple[str, str]]:
+        """
+        Get all stored chunk content hashes.
+        
+        Returns:
+            List of (document ID, content hash)
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT document_id, content_hash FROM chunk_hashes")
+                return cursor.fetchall()
+        except Exception as e:
+            self.logger.error(f"Error retrieving chunk hashes: {e}")
+            return []
+    
+    def remove_chunk_hashes(self, doc_ids: List[str]):
+        """
+        Remove content hashes for chunks that left the index.
+        
+        Args:
+            doc_ids: Document IDs whose hashes should be removed
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.executemany("DELETE FROM chunk_hashes WHERE document_id = ?", [(doc_id,) for doc_id in doc_ids])
+                conn.commit()
+        except Exception as e:
+            self.logger.error(f"Error removing chunk hashes: {e}")
+            raise
+    
+    def add_chunk_references(self, filename: str, doc_ids: List[str], category: Optional[str] = None, creation_date: Optional[str] = None):
+        """
+        Record that a file contains the given chunks.
+        
+        Args:
+            filename: The source filename
+            doc_ids: Document IDs of the chunks, including shared ones
+            category: The file's category
+            creation_date: The file's creation date
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO chunk_references (document_id, filename, category, creation_date) VALUES (?, ?, ?, ?)",
+                    [(doc_id, filename, category, creation_date) for doc_id in doc_ids]
+                )
+                conn.commit()
+        except Exception as e:
+            self.logger.error(f"Error storing chunk references: {e}")
+            raise
+    
+    def remove_chunk_references(self, filename: str, doc_ids: List[str]) -> List[str]:
+        """
+        Remove a file's references to its chunks.
+        
+        Args:
+            filename: The source filename
+            doc_ids: Document IDs of the file's chunks
+            
+        Returns:
+            The document IDs that are no longer referenced by any file
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM chunk_references WHERE filename = ?", (filename,))
+                orphaned = []
+                # A file can reference the same chunk more than once
+                for doc_id in dict.fromkeys(doc_ids):
+                    cursor.execute("SELECT 1 FROM chunk_references WHERE document_id = ? LIMIT 1", (doc_id,))
+                    if cursor.fetchone() is None:
+                        orphaned.append(doc_id)
+                conn.commit()
+                return orphaned
+        except Exception as e:
+            self.logger.error(f"Error removing chunk references: {e}")
+            raise
+    
+    def get_all_chunk_references(self) -> Dict[str, List[Dict[str, Optional[str]]]]:
+        """
+        Get the source files of every referenced chunk.
+        
+        Returns:
+            Dictionary mapping document IDs to one {'filename', 'category', 'creation_date'}
+            dictionary per file that contains them
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT document_id, filename, category, creation_date FROM chunk_references ORDER BY rowid")
+                return self._group_references(cursor.fetchall())
+        except Exception as e:
+            self.logger.error(f"Error retrieving chunk references: {e}")
+            return {}
+    
+    def get_chunk_references(self, doc_ids: List[str]) -> Dict[str, List[Dict[str, Optional[str]]]]:
+        """
+        Get the source files of the given chunks.
+        
+        Args:
+            doc_ids: Document IDs to look up
+            
+        Returns:
+            Same shape as `get_all_chunk_references`, restricted to the given IDs
+        """
+        try:
+            doc_ids = list(dict.fromkeys(doc_ids))
+            rows = []
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                # Stay below SQLite's limit on bound parameters
+                for start in range(0, len(doc_ids), 500):
+                    batch = doc_ids[start:start + 500]
+                    cursor.execute(
+                        "SELECT document_id, filename, category, creation_date FROM chunk_references "
+                        f"WHERE document_id IN ({', '.join('?' * len(batch))}) ORDER BY rowid",
+                        batch
+                    )
+                    rows.extend(cursor.fetchall())
+            return self._group_references(rows)
+        except Exception as e:
+            self.logger.error(f"Error retrieving chunk references: {e}")
+            return {}
+    
+    @staticmethod
+    def _group_references(rows) -> Dict[str, List[Dict[str, Optional[str]]]]:
+        references: Dict[str, List[Dict[str, Optional[str]]]] = {}
+        for doc_id, filename, category, creation_date in rows:
+            references.setdefault(doc_id, []).append(
+                {'filename': filename, 'category': category, 'creation_date': creation_date}
+            )
+        return references
\ No newline at end of file
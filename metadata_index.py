@@ -0,0 +1,184 @@
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Optional, Set, Tuple
+from langchain.docstore.document import Document
+
+
+class MetadataIndex:
+    """
+    In-memory inverted index from chunk metadata to FAISS index positions.
+    Lets filtered searches score only the matching chunks instead of the whole store.
+
+    Additions are indexed chunk by chunk with `index_chunk`; `build` is only needed at startup
+    and after deletions, which renumber FAISS positions.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.positions_by_filename: Dict[str, Set[int]] = defaultdict(set)
+        self.positions_by_category: Dict[str, Set[int]] = defaultdict(set)
+        self.dated_positions: Set[int] = set()
+        # (filename, category, creation date) of every file containing the chunk at each position
+        self.sources: Dict[int, List[Tuple[Optional[str], Optional[str], Optional[str]]]] = {}
+        self.position_by_id: Dict[str, int] = {}
+
+    @staticmethod
+    def _normalize_key(value: str) -> str:
+        """Normalize a filename or category so lookups ignore case and unicode form."""
+        return unicodedata.normalize('NFC', str(value)).strip().lower()
+
+    @staticmethod
+    def _normalize_date(value) -> Optional[str]:
+        """
+        Reduce a date to its YYYYMMDD prefix.
+
+        Accepts both PDF dates (e.g. "D:20230115120000+01'00'") and ISO dates ("2023-01-15").
+        """
+        if not value:
+            return None
+        digits = re.sub(r'\D', '', str(value))
+        return digits[:8] if len(digits) >= 8 else None
+
+    @staticmethod
+    def _filter_date(value) -> Optional[str]:
+        """
+        Convert a filter bound to YYYYMMDD.
+
+        Raises:
+            ValueError: If the bound is neither a date nor an ISO date string
+        """
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = date.fromisoformat(value)
+        if not isinstance(value, date):
+            raise ValueError(f"Invalid date filter: {value!r}")
+        return value.strftime('%Y%m%d')
+
+    def build(self, vector_store, references: Optional[Dict[str, List[Dict]]] = None) -> None:
+        """
+        Rebuild the index from the vector store's docstore.
+
+        Args:
+            vector_store: The LangChain FAISS store whose positions should be indexed
+            references: Optional mapping of docstore IDs to the files containing them, as
+                {'filename', 'category', 'creation_date'} dictionaries. A deduplicated chunk is
+                indexed under every referencing file; the chunk's own metadata is used when
+                there are no references or a reference predates stored file metadata.
+        """
+        self.positions_by_filename = defaultdict(set)
+        self.positions_by_category = defaultdict(set)
+        self.dated_positions = set()
+        self.sources = {}
+        self.position_by_id = {}
+
+        for position, docstore_id in vector_store.index_to_docstore_id.items():
+            doc = vector_store.docstore.search(docstore_id)
+            if not isinstance(doc, Document):
+                continue
+            self.index_chunk(position, docstore_id, doc.metadata or {}, (references or {}).get(docstore_id))
+
+        self.logger.debug(
+            f"Metadata index built: {len(self.positions_by_filename)} filenames, "
+            f"{len(self.positions_by_category)} categories, {len(self.dated_positions)} dated chunks"
+        )
+
+    def index_chunk(self, position: int, docstore_id: str, metadata: Dict, references: Optional[List[Dict]] = None) -> None:
+        """
+        Index (or re-index) a single chunk.
+
+        Args:
+            position: The chunk's FAISS position
+            docstore_id: The chunk's docstore ID
+            metadata: The chunk's own metadata
+            references: The files containing the chunk, as passed to `build`
+        """
+        self._unindex(position)
+        sources = self._sources(metadata, references)
+        self.sources[position] = sources
+        self.position_by_id[docstore_id] = position
+        for filename, category, creation_date in sources:
+            if filename:
+                self.positions_by_filename[filename].add(position)
+            if category:
+                self.positions_by_category[category].add(position)
+            if creation_date:
+                self.dated_positions.add(position)
+
+    def position_of(self, docstore_id: str) -> Optional[int]:
+        """The FAISS position of an indexed chunk, or None if it is not indexed."""
+        return self.position_by_id.get(docstore_id)
+
+    def _unindex(self, position: int) -> None:
+        for filename, category, _ in self.sources.pop(position, []):
+            for key, positions_by_key in ((filename, self.positions_by_filename), (category, self.positions_by_category)):
+                if key and key in positions_by_key:
+                    positions_by_key[key].discard(position)
+                    if not positions_by_key[key]:
+                        del positions_by_key[key]
+        self.dated_positions.discard(position)
+
+    def _sources(self, metadata: Dict, references: Optional[List[Dict]]) -> List[Tuple[Optional[str], Optional[str], Optional[str]]]:
+        """Normalized (filename, category, creation date) of each file containing a chunk."""
+        if not references:
+            references = [metadata]
+        sources = []
+        for reference in references:
+            filename = reference.get('filename')
+            category, creation_date = reference.get('category'), reference.get('creation_date')
+            if filename == metadata.get('filename'):
+                category = category or metadata.get('category')
+                creation_date = creation_date or metadata.get('creation_date')
+            sources.append((
+                self._normalize_key(filename) if filename else None,
+                self._normalize_key(category) if category else None,
+                self._normalize_date(creation_date),
+            ))
+        return sources
+
+    def select_positions(self, filters: Dict) -> Optional[List[int]]:
+        """
+        Resolve metadata filters to the FAISS positions that satisfy all of them.
+
+        A shared chunk matches when a single file containing it satisfies every filter.
+
+        Args:
+            filters: Dictionary with optional keys 'filenames', 'categories',
+                'created_after' and 'created_before' (dates or ISO date strings)
+
+        Returns:
+            Sorted list of matching positions, or None if no filter was set
+        """
+        filenames = {self._normalize_key(filename) for filename in filters.get('filenames') or []}
+        categories = {self._normalize_key(category) for category in filters.get('categories') or []}
+        lower = self._filter_date(filters.get('created_after'))
+        upper = self._filter_date(filters.get('created_before'))
+
+        candidates: Optional[Set[int]] = None
+        if filenames:
+            candidates = set().union(*(self.positions_by_filename.get(filename, set()) for filename in filenames))
+        if categories:
+            matching = set().union(*(self.positions_by_category.get(category, set()) for category in categories))
+            candidates = matching if candidates is None else candidates & matching
+        if lower or upper:
+            candidates = set(self.dated_positions) if candidates is None else candidates & self.dated_positions
+
+        if candidates is None:
+            return None
+
+        def matches(source) -> bool:
+            filename, category, creation_date = source
+            return (
+                (not filenames or filename in filenames)
+                and (not categories or category in categories)
+                and (lower is None or (creation_date is not None and creation_date >= lower))
+                and (upper is None or (creation_date is not None and creation_date <= upper))
+            )
+
+        return sorted(
+            position for position in candidates
+            if any(matches(source) for source in self.sources[position])
+        )
@@ -1,8 +1,18 @@
+from datetime import date
 from pydantic import BaseModel
+from typing import Optional
+
+class DocumentFilter(BaseModel):
+    filenames: Optional[list[str]] = None
+    categories: Optional[list[str]] = None
+    created_after: Optional[date] = None
+    created_before: Optional[date] = None
 
 class ChatRequest(BaseModel):
     user_prompt: str
     context: list[str]
+    filters: Optional[DocumentFilter] = None
+    retrieval_only: bool = False
 
 class ChatResponse(BaseModel) : 
     response : str
\ No newline at end of file
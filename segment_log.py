@@ -0,0 +1,229 @@
+import json
+import logging
+import os
+import pickle
+import re
+import shutil
+from typing import Callable, Iterator, List, Optional, Tuple
+import numpy as np
+
+
+class SegmentLogCorruptedError(Exception):
+    """Raised when a segment cannot be read back, so replaying past it would lose or reorder writes."""
+
+
+class SegmentLog:
+    """
+    Append-only log of vector store changes, stored next to a base snapshot.
+
+    Layout under the root directory:
+        CURRENT                JSON pointer to the base snapshot and the last segment folded into it
+        base_<sequence>/       FAISS `save_local` snapshot
+        segments/<sequence>.seg  one pickled add or delete record per change
+
+    Every file (including each file of a snapshot) is written under a temporary name, fsynced
+    and renamed into place, so a crash mid-write leaves the previous base and segments untouched.
+    """
+
+    CURRENT_FILE = "CURRENT"
+    SEGMENTS_DIR = "segments"
+    SEGMENT_PATTERN = re.compile(r"^(\d+)\.seg$")
+
+    def __init__(self, root: str):
+        """
+        Initialize the segment log.
+
+        Args:
+            root: Directory holding the base snapshot and the segments
+        """
+        self.root = root
+        self.segments_path = os.path.join(root, self.SEGMENTS_DIR)
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(self.segments_path, exist_ok=True)
+
+        self.base_name, self.base_sequence = self._read_current()
+        self.corrupted_segment: Optional[str] = None
+        self.next_sequence = max([self.base_sequence] + self.segment_sequences()) + 1
+
+    def _read_current(self) -> Tuple[Optional[str], int]:
+        """Read the CURRENT pointer, returning (base directory name, base sequence)."""
+        current_path = os.path.join(self.root, self.CURRENT_FILE)
+        if not os.path.exists(current_path):
+            return None, 0
+        with open(current_path, "r") as f:
+            current = json.load(f)
+        return current["base"], current["sequence"]
+
+    def base_path(self) -> Optional[str]:
+        """
+        Get the directory of the current base snapshot.
+
+        Returns:
+            The snapshot directory, the root itself for stores written before the
+            segment log existed, or None if there is no snapshot yet
+        """
+        if self.base_name:
+            return os.path.join(self.root, self.base_name)
+        if os.path.exists(os.path.join(self.root, "index.faiss")):
+            return self.root
+        return None
+
+    def segment_sequences(self) -> List[int]:
+        """Get the sequence numbers of all segment files on disk, in order."""
+        sequences = []
+        for name in os.listdir(self.segments_path):
+            match = self.SEGMENT_PATTERN.match(name)
+            if match:
+                sequences.append(int(match.group(1)))
+        return sorted(sequences)
+
+    def pending_segment_count(self) -> int:
+        """Number of segments not yet folded into the base snapshot."""
+        return sum(1 for sequence in self.segment_sequences() if sequence > self.base_sequence)
+
+    def _segment_file(self, sequence: int) -> str:
+        return os.path.join(self.segments_path, f"{sequence:012d}.seg")
+
+    def _atomic_write(self, path: str, data: bytes) -> None:
+        """Write bytes to a temporary file, fsync it and rename it over `path`."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self._fsync_dir(os.path.dirname(path))
+
+    @staticmethod
+    def _fsync_file(path: str) -> None:
+        """Flush a file written by someone else (e.g. FAISS `save_local`) to disk."""
+        with open(path, "rb") as f:
+            os.fsync(f.fileno())
+
+    def _fsync_tree(self, path: str) -> None:
+        """Flush every file under a directory, then the directories themselves."""
+        for dirpath, _, filenames in os.walk(path, topdown=False):
+            for filename in filenames:
+                self._fsync_file(os.path.join(dirpath, filename))
+            self._fsync_dir(dirpath)
+
+    @staticmethod
+    def _fsync_dir(path: str) -> None:
+        """Persist a rename by fsyncing the parent directory (no-op where unsupported)."""
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def _append(self, record: dict) -> int:
+        sequence = self.next_sequence
+        self.next_sequence += 1
+        self._atomic_write(self._segment_file(sequence), pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL))
+        self.logger.debug(f"Wrote segment {sequence} ({record['op']}, {len(record['ids'])} ids)")
+        return sequence
+
+    def append_add(self, ids: List[str], vectors: np.ndarray, texts: List[str], metadatas: List[dict]) -> int:
+        """
+        Log newly added chunks.
+
+        Args:
+            ids: Docstore IDs of the chunks
+            vectors: Embeddings of the chunks, one row per ID
+            texts: Chunk texts
+            metadatas: Chunk metadata dictionaries
+
+        Returns:
+            The sequence number of the written segment
+        """
+        return self._append({
+            "op": "add",
+            "ids": list(ids),
+            "vectors": np.asarray(vectors, dtype=np.float32),
+            "texts": list(texts),
+            "metadatas": list(metadatas),
+        })
+
+    def append_delete(self, ids: List[str]) -> int:
+        """
+        Log a delete marker for the given docstore IDs.
+
+        Returns:
+            The sequence number of the written segment
+        """
+        return self._append({"op": "delete", "ids": list(ids)})
+
+    def read_segments(self) -> Iterator[Tuple[int, dict]]:
+        """
+        Yield (sequence, record) for every segment newer than the base snapshot.
+
+        Raises:
+            SegmentLogCorruptedError: If a segment cannot be read. Segments are renamed into place
+                atomically, so this means on-disk damage; the file has to be repaired or removed
+                by hand before the store can be loaded or merged again.
+        """
+        for sequence in self.segment_sequences():
+            if sequence <= self.base_sequence:
+                continue
+            path = self._segment_file(sequence)
+            try:
+                with open(path, "rb") as f:
+                    record = pickle.load(f)
+            except Exception as e:
+                self.corrupted_segment = path
+                self.logger.error(f"Unreadable segment {path}: {e}")
+                raise SegmentLogCorruptedError(
+                    f"Segment {path} is unreadable; repair or remove it before loading the vector store"
+                ) from e
+            yield sequence, record
+
+    def install_base(self, write_snapshot: Callable[[str], None], sequence: int) -> None:
+        """
+        Write a new base snapshot and drop the base and segments it replaces.
+
+        Args:
+            write_snapshot: Callable writing the snapshot into the directory it is given
+            sequence: Last segment sequence already reflected in the snapshot
+
+        Raises:
+            SegmentLogCorruptedError: If an unreadable segment was found, since merging would
+                delete segments that were never replayed
+        """
+        if self.corrupted_segment:
+            raise SegmentLogCorruptedError(
+                f"Refusing to merge while segment {self.corrupted_segment} is unreadable"
+            )
+        name = f"base_{sequence:012d}"
+        final_path = os.path.join(self.root, name)
+        tmp_path = final_path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        write_snapshot(tmp_path)
+        # The snapshot must be on disk before CURRENT points at it and the segments are dropped
+        self._fsync_tree(tmp_path)
+        shutil.rmtree(final_path, ignore_errors=True)
+        os.replace(tmp_path, final_path)
+        self._fsync_dir(self.root)
+
+        previous_base = self.base_path()
+        self._atomic_write(
+            os.path.join(self.root, self.CURRENT_FILE),
+            json.dumps({"base": name, "sequence": sequence}).encode("utf-8")
+        )
+        self.base_name, self.base_sequence = name, sequence
+
+        for old_sequence in self.segment_sequences():
+            if old_sequence <= sequence:
+                os.remove(self._segment_file(old_sequence))
+        if previous_base == self.root:
+            for legacy_file in ("index.faiss", "index.pkl"):
+                legacy_path = os.path.join(self.root, legacy_file)
+                if os.path.exists(legacy_path):
+                    os.remove(legacy_path)
+        elif previous_base and previous_base != final_path:
+            shutil.rmtree(previous_base, ignore_errors=True)
+        self.logger.info(f"Installed base snapshot {name}")
@@ -0,0 +1,120 @@
+import threading
+import time
+import pytest
+from admission_controller import AdmissionController, AdmissionRejectedError
+from deadline import Deadline
+
+
+def enter_once(controller):
+    with controller.admit():
+        pass
+
+
+def hold_slot(controller, entered, release):
+    with controller.admit():
+        entered.set()
+        release.wait(5)
+
+
+def start_holder(controller, release):
+    entered = threading.Event()
+    thread = threading.Thread(target=hold_slot, args=(controller, entered, release))
+    thread.start()
+    assert entered.wait(5)
+    return thread
+
+
+def test_admits_up_to_the_concurrency_limit():
+    controller = AdmissionController(2, 0, 0.1, 1.0)
+
+    with controller.admit():
+        with controller.admit():
+            with pytest.raises(AdmissionRejectedError) as rejected:
+                with controller.admit():
+                    pass
+
+    assert rejected.value.status_code == 429
+    with controller.admit():
+        pass
+
+
+def test_queued_request_gets_the_released_slot():
+    controller = AdmissionController(1, 1, 5.0, 1.0)
+    release = threading.Event()
+    holder = start_holder(controller, release)
+
+    threading.Timer(0.05, release.set).start()
+    with controller.admit():
+        pass
+    holder.join(5)
+
+
+def test_rejects_with_429_when_queue_is_full():
+    controller = AdmissionController(1, 1, 5.0, 1.0)
+    release = threading.Event()
+    holder = start_holder(controller, release)
+    waiter = threading.Thread(target=enter_once, args=(controller,))
+    waiter.start()
+    while controller._waiting == 0:
+        time.sleep(0.01)
+
+    with pytest.raises(AdmissionRejectedError) as rejected:
+        with controller.admit():
+            pass
+
+    assert rejected.value.status_code == 429
+    assert rejected.value.retry_after >= 1
+    release.set()
+    holder.join(5)
+    waiter.join(5)
+
+
+def test_rejects_with_503_when_no_slot_frees_up():
+    controller = AdmissionController(1, 1, 0.05, 1.0)
+    release = threading.Event()
+    holder = start_holder(controller, release)
+
+    with pytest.raises(AdmissionRejectedError) as rejected:
+        with controller.admit():
+            pass
+
+    assert rejected.value.status_code == 503
+    assert controller._waiting == 0
+    release.set()
+    holder.join(5)
+
+
+def test_deadline_shortens_the_queue_wait():
+    controller = AdmissionController(1, 1, 5.0, 1.0)
+    release = threading.Event()
+    holder = start_holder(controller, release)
+
+    start = time.monotonic()
+    with pytest.raises(AdmissionRejectedError):
+        with controller.admit(Deadline(0.05)):
+            pass
+
+    assert time.monotonic() - start < 1.0
+    release.set()
+    holder.join(5)
+
+
+def test_slot_is_released_when_the_request_fails():
+    controller = AdmissionController(1, 0, 0.05, 1.0)
+
+    with pytest.raises(ValueError):
+        with controller.admit():
+            raise ValueError("boom")
+
+    with controller.admit():
+        pass
+
+
+def test_retry_after_tracks_service_time():
+    controller = AdmissionController(1, 4, 1.0, 10.0)
+    assert controller.retry_after() == 10
+
+    with controller.admit():
+        pass
+
+    assert 1 <= controller.retry_after() < 10
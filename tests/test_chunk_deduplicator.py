@@ -0,0 +1,96 @@
+import random
+import sqlite3
+from langchain.docstore.document import Document
+from chunk_deduplicator import ChunkDeduplicator
+from local_storage_manager import LocalStorageManager
+
+
+def paragraph(seed, words=160):
+    rng = random.Random(seed)
+    return " ".join(f"mot{rng.randint(0, 5000)}" for _ in range(words))
+
+
+def chunks(*texts):
+    return [Document(page_content=text, metadata={}) for text in texts]
+
+
+def test_exact_and_whitespace_duplicates_from_other_files_are_merged():
+    dedup = ChunkDeduplicator()
+    text = paragraph(1)
+
+    _, first_ids, _ = dedup.deduplicate(chunks(text))
+    new_documents, doc_ids, records = dedup.deduplicate(chunks("  " + text.replace(" ", "\n ")))
+
+    assert new_documents == [] and records == []
+    assert doc_ids == first_ids
+    assert dedup.stats()['duplicates'] == 1
+
+
+def test_near_duplicates_are_kept():
+    dedup = ChunkDeduplicator()
+    base = paragraph(2)
+    with_fees = base + " inscription avec frais de dossier sous 15 jours"
+    without_fees = base + " inscription sans frais de dossier sous 30 jours"
+
+    dedup.deduplicate(chunks(with_fees))
+    new_documents, _, _ = dedup.deduplicate(chunks(without_fees))
+
+    assert [doc.page_content for doc in new_documents] == [without_fees]
+    assert dedup.stats()['reduction_percent'] == 0.0
+
+
+def test_exact_duplicates_are_merged_within_a_file_and_across_reuploads():
+    dedup = ChunkDeduplicator()
+    header = paragraph(3)
+    body = paragraph(4)
+
+    new_documents, doc_ids, _ = dedup.deduplicate(chunks(header, body, header))
+    reupload, reupload_ids, _ = dedup.deduplicate(chunks(header, body, header))
+
+    assert [doc.page_content for doc in new_documents] == [header, body]
+    assert doc_ids[0] == doc_ids[2]
+    assert reupload == [] and reupload_ids == doc_ids
+    assert dedup.stats()['duplicates'] == 4
+
+
+def test_removed_chunks_are_stored_again():
+    dedup = ChunkDeduplicator()
+    text = paragraph(5)
+    _, doc_ids, _ = dedup.deduplicate(chunks(text))
+
+    dedup.remove(doc_ids)
+    new_documents, new_ids, _ = dedup.deduplicate(chunks(text))
+
+    assert len(new_documents) == 1 and new_ids != doc_ids
+
+
+def test_state_reloads_from_storage(tmp_path):
+    storage = LocalStorageManager(str(tmp_path / "index.db"))
+    dedup = ChunkDeduplicator()
+    text = paragraph(6)
+    _, doc_ids, records = dedup.deduplicate(chunks(text))
+    storage.store_chunk_hashes(records)
+
+    reloaded = ChunkDeduplicator(storage.get_all_chunk_hashes())
+
+    assert reloaded.deduplicate(chunks(text))[:2] == ([], doc_ids)
+
+
+def test_signature_table_is_migrated(tmp_path):
+    db_path = str(tmp_path / "index.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE chunk_signatures (document_id TEXT PRIMARY KEY, content_hash TEXT NOT NULL, minhash BLOB NOT NULL)")
+        conn.execute("INSERT INTO chunk_signatures VALUES ('x', 'abc', x'00')")
+
+    storage = LocalStorageManager(db_path)
+
+    assert storage.get_all_chunk_hashes() == [("x", "abc")]
+
+
+def test_shared_chunks_are_orphaned_only_by_their_last_file(tmp_path):
+    storage = LocalStorageManager(str(tmp_path / "index.db"))
+    storage.add_chunk_references("a.pdf", ["shared", "only-a", "only-a"])
+    storage.add_chunk_references("b.pdf", ["shared"])
+
+    assert storage.remove_chunk_references("a.pdf", ["shared", "only-a", "only-a"]) == ["only-a"]
+    assert storage.remove_chunk_references("b.pdf", ["shared"]) == ["shared"]
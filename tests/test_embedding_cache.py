@@ -0,0 +1,102 @@
+import sqlite3
+import threading
+import time
+import numpy as np
+from embedding_cache import EmbeddingCache
+
+
+def vectors(count, dimension=4, seed=0):
+    return np.random.RandomState(seed).rand(count, dimension).astype(np.float32)
+
+
+def test_miss_then_hit(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", 10)
+    data = vectors(2)
+
+    assert cache.get_many(["a", "b"]) == [None, None]
+    cache.put_many(["a", "b"], data)
+    results = cache.get_many(["b", "c", "a"])
+
+    np.testing.assert_array_equal(results[0], data[1])
+    assert results[1] is None
+    np.testing.assert_array_equal(results[2], data[0])
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_keys_ignore_whitespace_but_not_model(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", 10)
+    cache.put_many(["some  chunk\ntext"], vectors(1))
+
+    assert cache.get_many([" some chunk text "])[0] is not None
+    assert EmbeddingCache(str(tmp_path), "other-model", 10).get_many(["some chunk text"]) == [None]
+
+
+def test_entries_persist_across_instances(tmp_path):
+    data = vectors(3)
+    EmbeddingCache(str(tmp_path), "model", 10).put_many(["a", "b", "c"], data)
+
+    results = EmbeddingCache(str(tmp_path), "model", 10).get_many(["a", "b", "c"])
+
+    for result, expected in zip(results, data):
+        np.testing.assert_array_equal(result, expected)
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", 2)
+    data = vectors(3)
+    cache.put_many(["a", "b"], data[:2])
+    time.sleep(0.01)
+    cache.get_many(["a"])
+
+    cache.put_many(["c"], data[2:])
+
+    results = cache.get_many(["a", "b", "c"])
+    np.testing.assert_array_equal(results[0], data[0])
+    assert results[1] is None
+    np.testing.assert_array_equal(results[2], data[2])
+
+
+def test_overwritten_row_is_a_miss_and_can_be_restored(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", 10)
+    data = vectors(1)
+    cache.put_many(["a"], data)
+    # Simulate a row clobbered by a crashed writer
+    cache._vectors[0] = np.zeros(4, dtype=np.float32)
+    cache._vectors.flush()
+
+    assert cache.get_many(["a"]) == [None]
+    cache.put_many(["a"], data)
+    np.testing.assert_array_equal(cache.get_many(["a"])[0], data[0])
+
+
+def test_rows_without_checksum_are_re_embedded(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", 10)
+    data = vectors(1)
+    cache.put_many(["a"], data)
+    with sqlite3.connect(cache.db_path) as conn:
+        conn.execute("UPDATE embeddings SET checksum = NULL")
+
+    assert cache.get_many(["a"]) == [None]
+    cache.put_many(["a"], data)
+    np.testing.assert_array_equal(cache.get_many(["a"])[0], data[0])
+
+
+def test_concurrent_writers_never_share_a_row(tmp_path):
+    # Separate instances stand in for the API server and the build pipeline
+    writers = [EmbeddingCache(str(tmp_path), "model", 1000) for _ in range(4)]
+    texts = {i: [f"writer {i} chunk {j}" for j in range(50)] for i in range(4)}
+    data = {i: vectors(50, seed=i) for i in range(4)}
+
+    threads = [
+        threading.Thread(target=writers[i].put_many, args=(texts[i], data[i]))
+        for i in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    reader = EmbeddingCache(str(tmp_path), "model", 1000)
+    for i in range(4):
+        for result, expected in zip(reader.get_many(texts[i]), data[i]):
+            np.testing.assert_array_equal(result, expected)
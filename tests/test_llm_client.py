@@ -0,0 +1,74 @@
+import threading
+import time
+import pytest
+import requests
+import llm_client
+from circuit_breaker import CircuitBreaker
+from deadline import Deadline
+from llm_client import LLMClient, LLMUnavailableError
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+def test_malformed_body_settles_half_open_probe(monkeypatch):
+    client = LLMClient("http://llm")
+    client.circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    client.circuit_breaker.record_failure()
+    time.sleep(0.02)
+    monkeypatch.setattr(llm_client.requests, "post", lambda *args, **kwargs: FakeResponse(["not", "a", "dict"]))
+
+    with pytest.raises(LLMUnavailableError):
+        client.get_response("prompt", Deadline(1))
+
+    # The probe outcome was recorded, so a new probe is allowed once the reset timeout passes
+    assert client.circuit_breaker.state == CircuitBreaker.OPEN
+    time.sleep(0.02)
+    assert client.circuit_breaker.allow_request()
+
+
+def test_hedging_is_skipped_when_workers_are_busy(monkeypatch):
+    monkeypatch.setattr(llm_client.Config, "LLM_HEDGING_ENABLED", True)
+    client = LLMClient("http://llm")
+    client._latencies.extend([0.01] * llm_client.Config.LLM_HEDGE_MIN_SAMPLES)
+    client._hedge_in_flight = client._hedge_workers
+    caller = []
+
+    def post(*args, **kwargs):
+        caller.append(threading.current_thread().name)
+        return FakeResponse({"response": "ok"})
+
+    monkeypatch.setattr(llm_client.requests, "post", post)
+
+    assert client.get_response("prompt", Deadline(1)) == "ok"
+    assert caller == [threading.current_thread().name]
+
+
+def test_hedged_request_wins_and_workers_are_released(monkeypatch):
+    monkeypatch.setattr(llm_client.Config, "LLM_HEDGING_ENABLED", True)
+    client = LLMClient("http://llm")
+    client._latencies.extend([0.01] * llm_client.Config.LLM_HEDGE_MIN_SAMPLES)
+    calls = []
+    release_primary = threading.Event()
+
+    def post(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            release_primary.wait(2)
+            raise requests.Timeout("stuck")
+        return FakeResponse({"response": "hedged"})
+
+    monkeypatch.setattr(llm_client.requests, "post", post)
+
+    assert client.get_response("prompt", Deadline(2)) == "hedged"
+    release_primary.set()
+    time.sleep(0.1)
+    assert client._hedge_in_flight == 0
@@ -0,0 +1,140 @@
+import sqlite3
+from datetime import date
+import pytest
+from pydantic import ValidationError
+from langchain.docstore.document import Document
+from local_storage_manager import LocalStorageManager
+from metadata_index import MetadataIndex
+from models import DocumentFilter
+
+
+class StubDocstore:
+    def __init__(self, documents):
+        self._dict = documents
+
+    def search(self, docstore_id):
+        return self._dict.get(docstore_id)
+
+
+class StubStore:
+    def __init__(self, documents):
+        self.docstore = StubDocstore(documents)
+        self.index_to_docstore_id = dict(enumerate(documents))
+
+
+def chunk(filename, category, creation_date):
+    return Document(
+        page_content=filename,
+        metadata={'filename': filename, 'category': category, 'creation_date': creation_date}
+    )
+
+
+def build(documents, references=None):
+    index = MetadataIndex()
+    index.build(StubStore(documents), references)
+    return index
+
+
+def test_filters_intersect_across_attributes():
+    index = build({
+        "a": chunk("Guide A.pdf", "guide", "D:20230115120000"),
+        "b": chunk("Service des Mastères.pdf", "service", "2024-03-01"),
+    })
+
+    assert index.select_positions({}) is None
+    assert index.select_positions({'categories': ["Guide", "service"]}) == [0, 1]
+    assert index.select_positions({'filenames': ["guide a.pdf"], 'categories': ["service"]}) == []
+    assert index.select_positions({'created_after': "2024-01-01"}) == [1]
+    assert index.select_positions({'categories': ["guide"], 'created_before': "2023-12-31"}) == [0]
+
+
+def test_date_filters_come_from_the_request_model():
+    index = build({
+        "a": chunk("Guide A.pdf", "guide", "D:20230115120000"),
+        "b": chunk("Service des Mastères.pdf", "service", "2024-03-01"),
+    })
+    filters = DocumentFilter(created_after="2023-02-01", created_before=date(2024, 12, 31)).dict(exclude_none=True)
+
+    assert index.select_positions(filters) == [1]
+
+
+@pytest.mark.parametrize("value", ["2024-01", "2024-1-5", "Jan 2024", "15/01/2023"])
+def test_malformed_date_filters_are_rejected(value):
+    with pytest.raises(ValidationError):
+        DocumentFilter(created_after=value)
+    with pytest.raises(ValueError):
+        MetadataIndex().select_positions({'created_before': value})
+
+
+def test_shared_chunk_is_indexed_under_every_referencing_file():
+    references = {"shared": [
+        {'filename': "Guide A.pdf", 'category': "guide", 'creation_date': "D:20230115120000"},
+        {'filename': "Service des Mastères.pdf", 'category': "service", 'creation_date': "2024-03-01"},
+    ]}
+    index = build({"shared": chunk("Guide A.pdf", "guide", "D:20230115120000")}, references)
+
+    assert index.select_positions({'filenames': ["Service des Mastères.pdf"], 'categories': ["service"]}) == [0]
+    assert index.select_positions({'categories': ["service"], 'created_after': "2024-01-01"}) == [0]
+
+
+def test_shared_chunk_needs_one_file_matching_every_filter():
+    references = {"shared": [
+        {'filename': "Guide A.pdf", 'category': "guide", 'creation_date': "2023-01-15"},
+        {'filename': "Service des Mastères.pdf", 'category': "service", 'creation_date': "2024-03-01"},
+    ]}
+    index = build({"shared": chunk("Guide A.pdf", "guide", "2023-01-15")}, references)
+
+    assert index.select_positions({'filenames': ["Guide A.pdf"], 'categories': ["service"]}) == []
+    assert index.select_positions({'categories': ["guide"], 'created_after': "2024-01-01"}) == []
+
+
+def test_index_chunk_adds_and_replaces_single_positions():
+    index = build({"a": chunk("Guide A.pdf", "guide", "2023-01-15")})
+    index.index_chunk(1, "b", chunk("b.pdf", "service", "2024-03-01").metadata)
+
+    assert index.position_of("b") == 1
+    assert index.select_positions({'categories': ["service"]}) == [1]
+
+    index.index_chunk(0, "a", chunk("Guide A.pdf", "guide", "2023-01-15").metadata, [
+        {'filename': "b.pdf", 'category': "service", 'creation_date': "2024-03-01"},
+    ])
+
+    assert index.select_positions({'categories': ["service"]}) == [0, 1]
+    assert index.select_positions({'categories': ["guide"]}) == []
+    assert index.select_positions({'created_before': "2023-12-31"}) == []
+
+
+def test_legacy_references_fall_back_to_chunk_metadata():
+    references = {"a": [{'filename': "Guide A.pdf", 'category': None, 'creation_date': None}]}
+    index = build({"a": chunk("Guide A.pdf", "guide", "2023-01-15")}, references)
+
+    assert index.select_positions({'categories': ["guide"], 'created_before': "2023-02-01"}) == [0]
+
+
+def test_references_store_file_metadata(tmp_path):
+    storage = LocalStorageManager(str(tmp_path / "index.db"))
+    storage.add_chunk_references("a.pdf", ["x"], "guide", "2023-01-15")
+    storage.add_chunk_references("b.pdf", ["x"])
+
+    assert storage.get_all_chunk_references() == {"x": [
+        {'filename': "a.pdf", 'category': "guide", 'creation_date': "2023-01-15"},
+        {'filename': "b.pdf", 'category': None, 'creation_date': None},
+    ]}
+
+
+def test_references_can_be_read_for_some_chunks(tmp_path):
+    storage = LocalStorageManager(str(tmp_path / "index.db"))
+    storage.add_chunk_references("a.pdf", ["x", "y"], "guide")
+
+    assert storage.get_chunk_references(["y", "z"]) == {"y": [{'filename': "a.pdf", 'category': "guide", 'creation_date': None}]}
+
+
+def test_reference_table_is_migrated(tmp_path):
+    db_path = str(tmp_path / "index.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE chunk_references (document_id TEXT NOT NULL, filename TEXT NOT NULL, PRIMARY KEY (document_id, filename))")
+        conn.execute("INSERT INTO chunk_references VALUES ('x', 'a.pdf')")
+
+    storage = LocalStorageManager(db_path)
+
+    assert storage.get_all_chunk_references() == {"x": [{'filename': "a.pdf", 'category': None, 'creation_date': None}]}
@@ -0,0 +1,145 @@
+import os
+import numpy as np
+import pytest
+from segment_log import SegmentLog, SegmentLogCorruptedError
+
+
+def write_snapshot(path):
+    os.makedirs(path)
+    with open(os.path.join(path, "index.faiss"), "w") as f:
+        f.write("snapshot")
+
+
+def add_segment(log, ids):
+    return log.append_add(ids, np.zeros((len(ids), 3)), [f"text {i}" for i in ids], [{} for _ in ids])
+
+
+def test_segments_replay_in_order_after_reopen(tmp_path):
+    log = SegmentLog(str(tmp_path))
+    add_segment(log, ["a", "b"])
+    log.append_delete(["a"])
+
+    reopened = SegmentLog(str(tmp_path))
+    records = list(reopened.read_segments())
+
+    assert [sequence for sequence, _ in records] == [1, 2]
+    assert records[0][1]["op"] == "add" and records[0][1]["ids"] == ["a", "b"]
+    assert records[1][1] == {"op": "delete", "ids": ["a"]}
+    assert reopened.next_sequence == 3
+
+
+def test_install_base_drops_covered_segments_only(tmp_path):
+    log = SegmentLog(str(tmp_path))
+    add_segment(log, ["a"])
+    add_segment(log, ["b"])
+    log.install_base(write_snapshot, 2)
+    add_segment(log, ["c"])
+
+    reopened = SegmentLog(str(tmp_path))
+
+    assert reopened.base_path() == os.path.join(str(tmp_path), "base_000000000002")
+    assert reopened.segment_sequences() == [3]
+    assert [record["ids"] for _, record in reopened.read_segments()] == [["c"]]
+
+
+def test_snapshot_is_flushed_before_current_is_switched(tmp_path, monkeypatch):
+    log = SegmentLog(str(tmp_path))
+    add_segment(log, ["a"])
+    events = []
+    real_fsync_file, real_fsync_dir, real_replace = SegmentLog._fsync_file, SegmentLog._fsync_dir, os.replace
+
+    def record_fsync_file(path):
+        events.append(("fsync", os.path.basename(os.path.dirname(path)), os.path.basename(path)))
+        real_fsync_file(path)
+
+    def record_fsync_dir(path):
+        events.append(("fsync", os.path.basename(path), None))
+        real_fsync_dir(path)
+
+    def record_replace(src, dst):
+        events.append(("replace", os.path.basename(dst), None))
+        real_replace(src, dst)
+
+    def write_faiss_files(path):
+        os.makedirs(path)
+        for name in ("index.faiss", "index.pkl"):
+            with open(os.path.join(path, name), "w") as f:
+                f.write(name)
+
+    monkeypatch.setattr(SegmentLog, "_fsync_file", staticmethod(record_fsync_file))
+    monkeypatch.setattr(SegmentLog, "_fsync_dir", staticmethod(record_fsync_dir))
+    monkeypatch.setattr(os, "replace", record_replace)
+    log.install_base(write_faiss_files, 1)
+
+    switch = events.index(("replace", "CURRENT", None))
+    flushed = events[:switch]
+    tmp_name = "base_000000000001.tmp"
+    assert ("fsync", tmp_name, "index.faiss") in flushed
+    assert ("fsync", tmp_name, "index.pkl") in flushed
+    assert flushed.index(("fsync", tmp_name, None)) < flushed.index(("replace", "base_000000000001", None))
+
+
+def test_new_base_replaces_previous_base(tmp_path):
+    log = SegmentLog(str(tmp_path))
+    add_segment(log, ["a"])
+    log.install_base(write_snapshot, 1)
+    add_segment(log, ["b"])
+    log.install_base(write_snapshot, 2)
+
+    assert not os.path.exists(os.path.join(str(tmp_path), "base_000000000001"))
+    assert os.path.exists(os.path.join(str(tmp_path), "base_000000000002"))
+
+
+def test_leftover_temporary_files_are_ignored(tmp_path):
+    log = SegmentLog(str(tmp_path))
+    add_segment(log, ["a"])
+    # A crash before the rename leaves only a temporary file behind
+    with open(os.path.join(log.segments_path, "000000000002.seg.tmp"), "wb") as f:
+        f.write(b"partial")
+
+    reopened = SegmentLog(str(tmp_path))
+
+    assert [sequence for sequence, _ in reopened.read_segments()] == [1]
+
+
+def test_crash_while_writing_snapshot_keeps_previous_base(tmp_path):
+    log = SegmentLog(str(tmp_path))
+    add_segment(log, ["a"])
+
+    def crashing_snapshot(path):
+        os.makedirs(path)
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        log.install_base(crashing_snapshot, 1)
+
+    reopened = SegmentLog(str(tmp_path))
+    assert reopened.base_path() is None
+    assert [record["ids"] for _, record in reopened.read_segments()] == [["a"]]
+
+
+def test_legacy_store_is_used_as_base(tmp_path):
+    with open(os.path.join(str(tmp_path), "index.faiss"), "w") as f:
+        f.write("legacy")
+
+    log = SegmentLog(str(tmp_path))
+
+    assert log.base_path() == str(tmp_path)
+
+
+def test_unreadable_segment_fails_replay_and_blocks_merge(tmp_path):
+    log = SegmentLog(str(tmp_path))
+    add_segment(log, ["a"])
+    add_segment(log, ["b"])
+    add_segment(log, ["c"])
+    with open(os.path.join(log.segments_path, "000000000002.seg"), "wb") as f:
+        f.write(b"garbage")
+
+    reopened = SegmentLog(str(tmp_path))
+    with pytest.raises(SegmentLogCorruptedError):
+        list(reopened.read_segments())
+    with pytest.raises(SegmentLogCorruptedError):
+        reopened.install_base(write_snapshot, reopened.next_sequence - 1)
+
+    # The valid segment after the damaged one is still on disk
+    assert reopened.segment_sequences() == [1, 2, 3]
@@ -0,0 +1,123 @@
+import hashlib
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("langchain_community")
+
+import numpy as np
+from langchain.docstore.document import Document
+from langchain_core.embeddings import Embeddings
+from config import Config
+from vector_store_manager import VectorStoreManager
+
+
+class FakeEmbeddings(Embeddings):
+    """Bag-of-words hashing embedding: texts sharing words are close, no model download needed."""
+
+    model_name = "fake-embeddings"
+    dimension = 64
+
+    def _embed(self, text):
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in text.lower().split():
+            vector[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % self.dimension] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Config, "VECTOR_STORE_PATH", str(tmp_path / "vector_store"))
+    monkeypatch.setattr(Config, "EMBEDDING_CACHE_PATH", str(tmp_path / "embedding_cache"))
+    return tmp_path
+
+
+def pdf_chunks(filename, category, creation_date, *texts):
+    metadata = {'filename': filename, 'category': category, 'creation_date': creation_date}
+    return [Document(page_content=text, metadata=dict(metadata)) for text in texts]
+
+
+def filenames(documents):
+    return sorted(doc.metadata['filename'] for doc in documents)
+
+
+def load(manager_documents):
+    manager = VectorStoreManager(FakeEmbeddings())
+    for filename, documents in manager_documents:
+        assert manager.add_documents(documents, filename)
+    return manager
+
+
+SHARED = "les frais de mission sont rembourses sur presentation du billet tunis air"
+
+
+def test_filtered_search_only_scores_matching_chunks(workdir):
+    manager = load([
+        ("guide.pdf", pdf_chunks("guide.pdf", "guide", "D:20230115", "inscription au master en informatique")),
+        ("service.pdf", pdf_chunks("service.pdf", "service", "D:20240301", "inscription au service des stages")),
+    ])
+
+    assert filenames(manager.search_documents("inscription", k=5, filters={'categories': ["service"]})) == ["service.pdf"]
+    assert filenames(manager.search_documents("inscription", k=5, filters={'created_before': "2023-12-31"})) == ["guide.pdf"]
+    assert manager.search_documents("inscription", k=5, filters={'filenames': ["missing.pdf"]}) == []
+
+
+def test_shared_chunk_is_stored_once_and_survives_deleting_one_file(workdir):
+    manager = load([
+        ("avec.pdf", pdf_chunks("avec.pdf", "guide", "D:20230115", SHARED, "mission avec frais")),
+        ("sans.pdf", pdf_chunks("sans.pdf", "service", "D:20240301", SHARED, "mission sans frais")),
+    ])
+    size = manager.get_store_size()
+
+    assert size == 1 + 3  # placeholder plus three distinct chunks
+    found = manager.search_documents(SHARED, k=1, filters={'categories': ["service"]})
+    assert [doc.page_content for doc in found] == [SHARED]
+
+    assert manager.delete_documents("avec.pdf")
+
+    assert manager.get_store_size() == size - 1
+    found = manager.search_documents(SHARED, k=5, filters={'filenames': ["sans.pdf"]})
+    assert SHARED in [doc.page_content for doc in found]
+    assert manager.search_documents(SHARED, k=5, filters={'filenames': ["avec.pdf"]}) == []
+    assert filenames(manager.search_documents(SHARED, k=1)) == ["sans.pdf"]
+
+
+def test_reload_replays_segments(workdir):
+    manager = load([
+        ("guide.pdf", pdf_chunks("guide.pdf", "guide", "D:20230115", "inscription au master")),
+        ("service.pdf", pdf_chunks("service.pdf", "service", "D:20240301", "service des stages")),
+    ])
+    assert manager.delete_documents("guide.pdf")
+    size = manager.get_store_size()
+
+    reloaded = VectorStoreManager(FakeEmbeddings())
+
+    assert reloaded.get_store_size() == size
+    assert filenames(reloaded.search_documents("stages", k=5, filters={'categories': ["service"]})) == ["service.pdf"]
+    assert reloaded.search_documents("master", k=5, filters={'filenames': ["guide.pdf"]}) == []
+    # Re-uploading a file after a restart is recognised as a duplicate of the indexed chunks
+    assert reloaded.add_documents(pdf_chunks("service.pdf", "service", "D:20240301", "service des stages"), "service.pdf")
+    assert reloaded.get_store_size() == size
+
+
+def test_reload_from_merged_base_snapshot(workdir):
+    manager = load([
+        ("guide.pdf", pdf_chunks("guide.pdf", "guide", "D:20230115", "inscription au master")),
+        ("service.pdf", pdf_chunks("service.pdf", "service", "D:20240301", "service des stages")),
+    ])
+    manager.persist_vector_store()
+    assert manager.segment_log.pending_segment_count() == 0
+    assert manager.delete_documents("guide.pdf")
+
+    reloaded = VectorStoreManager(FakeEmbeddings())
+
+    assert reloaded.get_store_size() == manager.get_store_size()
+    assert filenames(reloaded.search_documents("stages", k=5, filters={'categories': ["service"]})) == ["service.pdf"]
+    assert "guide.pdf" not in [doc.metadata.get('filename') for doc in reloaded.search_documents("master", k=5)]
@@ -1,11 +1,17 @@
 import logging
-from typing import List, Dict, Set
+from typing import List, Dict, Optional, Set
 from langchain.docstore.document import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
 from local_storage_manager import LocalStorageManager
+from metadata_index import MetadataIndex
+from embedding_cache import EmbeddingCache
+from chunk_deduplicator import ChunkDeduplicator
+from segment_log import SegmentLog
 from config import Config
-import os
-import uuid
+import numpy as np
+import faiss
+import threading
 
 # Configure logging
 logging.basicConfig(
@@ -19,12 +25,25 @@ class VectorStoreManager:
         self.embedding_model = embedding_model
         self.logger.debug(f"Initializing VectorStoreManager with model: {embedding_model.__class__.__name__}")
         
+        self._lock = threading.RLock()
+        self._merge_lock = threading.Lock()
+        self._merge_thread = None
+        
         try:
-            if os.path.exists(Config.VECTOR_STORE_PATH):
-                self.logger.debug(f"Found existing vector store at {Config.VECTOR_STORE_PATH}")
+            self.embedding_cache = EmbeddingCache(
+                Config.EMBEDDING_CACHE_PATH,
+                getattr(embedding_model, 'model_name', embedding_model.__class__.__name__),
+                Config.EMBEDDING_CACHE_MAX_ENTRIES
+            )
+            self.segment_log = SegmentLog(Config.VECTOR_STORE_PATH)
+            base_path = self.segment_log.base_path()
+            if base_path:
+                self.logger.debug(f"Found existing vector store at {base_path}")
+                # The snapshot is written by persist_vector_store, so its pickle is trusted
                 self.vector_store = FAISS.load_local(
-                    Config.VECTOR_STORE_PATH, 
-                    self.embedding_model
+                    base_path, 
+                    self.embedding_model,
+                    allow_dangerous_deserialization=True
                 )
                 store_size = len(self.vector_store.index_to_docstore_id)
                 self.logger.debug(f"Loaded vector store contains {store_size} documents")
@@ -38,6 +57,13 @@ class VectorStoreManager:
                 test_result = self.vector_store.similarity_search("test", k=1)
                 self.logger.debug(f"Test search returned {len(test_result)} results")
             
+            # Replay changes logged since the base snapshot
+            replayed = 0
+            for _, record in self.segment_log.read_segments():
+                self._apply_segment(record)
+                replayed += 1
+            self.logger.debug(f"Replayed {replayed} segments on top of the base snapshot")
+            
             # Verify vector store attributes
             self.logger.debug(f"Vector store attributes:")
             self.logger.debug(f"- Index type: {type(self.vector_store.index)}")
@@ -46,6 +72,13 @@ class VectorStoreManager:
             
             # Initialize local storage manager
             self.local_storage_manager = LocalStorageManager()
+
+            # Load hashes of indexed chunks for duplicate detection
+            self.deduplicator = ChunkDeduplicator(self.local_storage_manager.get_all_chunk_hashes())
+
+            # Index chunk metadata for filtered search
+            self.metadata_index = MetadataIndex()
+            self._refresh_metadata_index()
             
         except Exception as e:
             self.logger.error(f"Failed to initialize vector store: {e}", exc_info=True)
@@ -66,30 +99,52 @@ class VectorStoreManager:
                 self.logger.debug(f"- Content length: {len(doc.page_content)}")
                 self.logger.debug(f"- Metadata: {doc.metadata}")
                 
-            # Ensure each document has a document_id
-            doc_ids = []
-            for doc in documents:
-                if 'document_id' not in doc.metadata:
-                    doc.metadata['document_id'] = str(uuid.uuid4())
-                doc_ids.append(doc.metadata['document_id'])
-                
-            # Store initial size
-            initial_size = len(self.vector_store.index_to_docstore_id)
-            self.logger.debug(f"Vector store size before addition: {initial_size}")
-            
-            # Add documents to vector store
-            self.vector_store.add_documents(documents)
+            # Reuse chunks already indexed verbatim (here or in other files); each new chunk gets a document_id
+            with self._lock:
+                new_documents, doc_ids, hashes = self.deduplicator.deduplicate(documents)
+            new_ids = [doc.metadata['document_id'] for doc in new_documents]
+            self.logger.debug(
+                f"Deduplicated {filename}: {len(new_documents)} new chunks, "
+                f"{len(documents) - len(new_documents)} duplicates referenced"
+            )
             
-            # Verify addition
-            final_size = len(self.vector_store.index_to_docstore_id)
-            self.logger.debug(f"Vector store size after addition: {final_size}")
-            self.logger.debug(f"Added {final_size - initial_size} new documents")
-            
-            # Store document mapping
-            self.local_storage_manager.store_document_ids(filename, doc_ids)
+            try:
+                texts = [doc.page_content for doc in new_documents]
+                metadatas = [doc.metadata for doc in new_documents]
+                vectors = self._embed_documents(texts) if new_documents else None
+                
+                with self._lock:
+                    # Store initial size
+                    initial_size = len(self.vector_store.index_to_docstore_id)
+                    self.logger.debug(f"Vector store size before addition: {initial_size}")
+                    
+                    if new_documents:
+                        # Log the change before applying it, then add documents to vector store
+                        self.segment_log.append_add(new_ids, vectors, texts, metadatas)
+                        self.vector_store.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=new_ids)
+                    
+                    # Verify addition
+                    final_size = len(self.vector_store.index_to_docstore_id)
+                    self.logger.debug(f"Vector store size after addition: {final_size}")
+                    self.logger.debug(f"Added {final_size - initial_size} new documents")
+                    
+                    # Store document mapping, chunk references and hashes
+                    self.local_storage_manager.store_document_ids(filename, doc_ids)
+                    file_metadata = documents[0].metadata
+                    self.local_storage_manager.add_chunk_references(
+                        filename, doc_ids, file_metadata.get('category'), file_metadata.get('creation_date')
+                    )
+                    self.local_storage_manager.store_chunk_hashes(hashes)
+                    # Appended chunks take the positions after the previous end; reused ones keep theirs
+                    self._update_metadata_index(
+                        doc_ids, {doc_id: initial_size + i for i, doc_id in enumerate(new_ids)}
+                    )
+            except Exception:
+                with self._lock:
+                    self.deduplicator.remove(new_ids)
+                raise
             
-            # Save vector store to disk
-            self.persist_vector_store()
+            self._schedule_merge()
             
             return True
             
@@ -97,17 +152,77 @@ class VectorStoreManager:
             self.logger.error(f"Error adding documents: {e}", exc_info=True)
             return False
 
-    def search_documents(self, query: str, k: int = 5) -> List[Document]:
-        """Search for relevant documents."""
+    def _embed_documents(self, texts: List[str]) -> np.ndarray:
+        """Embed chunk texts, reusing cached embeddings and only calling the model for the rest."""
         try:
-            self.logger.debug(f"Searching for query: {query}, k={k}")
-            results = self.vector_store.similarity_search(query, k=k)
+            vectors = self.embedding_cache.get_many(texts)
+        except Exception as e:
+            self.logger.error(f"Error reading embedding cache: {e}", exc_info=True)
+            vectors = [None] * len(texts)
+
+        # Embed each distinct missing text once
+        missing: Dict[str, List[int]] = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(texts[i], []).append(i)
+        self.logger.debug(f"Embedding cache: {len(texts) - sum(map(len, missing.values()))} hits, {len(missing)} texts to embed")
+
+        if missing:
+            missing_texts = list(missing)
+            computed = np.array(self.embedding_model.embed_documents(missing_texts), dtype=np.float32)
+            for text, vector in zip(missing_texts, computed):
+                for i in missing[text]:
+                    vectors[i] = vector
+            try:
+                self.embedding_cache.put_many(missing_texts, computed)
+            except Exception as e:
+                self.logger.error(f"Error writing embedding cache: {e}", exc_info=True)
+
+        return np.vstack(vectors).astype(np.float32)
+
+    def search_documents(self, query: str, k: int = 5, filters: Optional[Dict] = None) -> List[Document]:
+        """Search for relevant documents, optionally restricted by metadata filters."""
+        try:
+            self.logger.debug(f"Searching for query: {query}, k={k}, filters={filters}")
+            query_embedding = self.embedding_model.embed_query(query)
+            with self._lock:
+                positions = self.metadata_index.select_positions(filters) if filters else None
+                if positions is None:
+                    results = self.vector_store.similarity_search_by_vector(query_embedding, k=k)
+                else:
+                    results = self._search_positions(query_embedding, k, positions)
             self.logger.debug(f"Found {len(results)} matching documents")
             return results
         except Exception as e:
             self.logger.error(f"Error searching documents: {e}", exc_info=True)
             return []
 
+    def _search_positions(self, query_embedding: List[float], k: int, positions: List[int]) -> List[Document]:
+        """Score only the given FAISS positions, using an ID selector so filtering happens before scoring."""
+        if not positions:
+            return []
+
+        query_vector = np.array([query_embedding], dtype=np.float32)
+        if getattr(self.vector_store, '_normalize_L2', False):
+            faiss.normalize_L2(query_vector)
+
+        selector = faiss.IDSelectorBatch(np.array(positions, dtype=np.int64))
+        _, indices = self.vector_store.index.search(
+            query_vector,
+            min(k, len(positions)),
+            params=faiss.SearchParameters(sel=selector)
+        )
+
+        results = []
+        for position in indices[0]:
+            if position == -1:
+                continue
+            docstore_id = self.vector_store.index_to_docstore_id[int(position)]
+            doc = self.vector_store.docstore.search(docstore_id)
+            if isinstance(doc, Document):
+                results.append(doc)
+        return results
+
     def delete_documents(self, filename: str) -> bool:
         """Delete documents associated with a filename."""
         try:
@@ -116,25 +231,142 @@ class VectorStoreManager:
                 self.logger.warning(f"No documents found for filename: {filename}")
                 return False
                 
-            self.logger.debug(f"Deleting {len(doc_ids)} documents for {filename}")
-            self.vector_store.delete(doc_ids)
-            self.local_storage_manager.remove_document_mapping(filename)
-            
-            # Verify deletion
-            remaining_docs = len(self.vector_store.index_to_docstore_id)
-            self.logger.debug(f"Vector store now contains {remaining_docs} documents")
+            with self._lock:
+                # Chunks shared with other files stay; only those no file references any more are deleted
+                orphaned_ids = self.local_storage_manager.remove_chunk_references(filename, doc_ids)
+                docstore_ids = self._resolve_docstore_ids(orphaned_ids)
+                self.logger.debug(
+                    f"Deleting {len(docstore_ids)} documents for {filename}, "
+                    f"keeping {len(doc_ids) - len(orphaned_ids)} shared with other files"
+                )
+                if docstore_ids:
+                    self.segment_log.append_delete(docstore_ids)
+                    self.vector_store.delete(docstore_ids)
+                self.deduplicator.remove(orphaned_ids)
+                self.local_storage_manager.remove_chunk_hashes(orphaned_ids)
+                self.local_storage_manager.remove_document_mapping(filename)
+                if docstore_ids:
+                    # Deleting renumbers FAISS positions, so the whole index has to be rebuilt
+                    self._refresh_metadata_index()
+                else:
+                    self._update_metadata_index(doc_ids)
+                
+                # Verify deletion
+                remaining_docs = len(self.vector_store.index_to_docstore_id)
+                self.logger.debug(f"Vector store now contains {remaining_docs} documents")
             
-            self.persist_vector_store()
+            self._schedule_merge()
             return True
             
         except Exception as e:
             self.logger.error(f"Error deleting documents: {e}", exc_info=True)
             return False
 
+    def _refresh_metadata_index(self) -> None:
+        """Rebuild the metadata index, attributing shared chunks to every file that contains them."""
+        references = self.local_storage_manager.get_all_chunk_references()
+        docstore = self.vector_store.docstore._dict
+        for docstore_id, refs in references.items():
+            if docstore_id in docstore:
+                self._reattribute(docstore[docstore_id], refs)
+        self.metadata_index.build(self.vector_store, references)
+
+    def _update_metadata_index(self, doc_ids: List[str], new_positions: Optional[Dict[str, int]] = None) -> None:
+        """
+        Re-index only the given chunks after their references changed.
+
+        Only valid while no deletion has renumbered FAISS positions since the index was built.
+
+        Args:
+            doc_ids: Document IDs of the chunks whose references changed
+            new_positions: FAISS positions of chunks that were just appended
+        """
+        positions = dict(new_positions or {})
+        for doc_id in doc_ids:
+            position = self.metadata_index.position_of(doc_id)
+            if doc_id not in positions and position is not None:
+                positions[doc_id] = position
+        references = self.local_storage_manager.get_chunk_references(list(positions))
+        docstore = self.vector_store.docstore._dict
+        for doc_id, position in positions.items():
+            doc = docstore.get(doc_id)
+            if doc is None:
+                continue
+            refs = references.get(doc_id)
+            if refs:
+                self._reattribute(doc, refs)
+            self.metadata_index.index_chunk(position, doc_id, doc.metadata, refs)
+
+    @staticmethod
+    def _reattribute(doc: Document, refs: List[Dict]) -> None:
+        """Point a chunk's metadata at a file that still contains it."""
+        if doc.metadata.get('filename') in [ref['filename'] for ref in refs]:
+            return
+        # The file the chunk was first ingested from is gone; attribute it to one that remains
+        doc.metadata['filename'] = refs[0]['filename']
+        for key in ('category', 'creation_date'):
+            if refs[0][key]:
+                doc.metadata[key] = refs[0][key]
+            else:
+                doc.metadata.pop(key, None)
+
+    def _resolve_docstore_ids(self, doc_ids: List[str]) -> List[str]:
+        """Map stored document IDs to docstore IDs, including chunks added before IDs were aligned."""
+        docstore = self.vector_store.docstore._dict
+        resolved = [doc_id for doc_id in doc_ids if doc_id in docstore]
+        missing = set(doc_ids) - set(resolved)
+        if missing:
+            for docstore_id, doc in docstore.items():
+                if doc.metadata.get('document_id') in missing:
+                    resolved.append(docstore_id)
+        return resolved
+
+    def _apply_segment(self, record: Dict) -> None:
+        """Apply a logged change to the in-memory store. Re-applying a segment is a no-op."""
+        docstore = self.vector_store.docstore._dict
+        if record['op'] == 'add':
+            new = [i for i, doc_id in enumerate(record['ids']) if doc_id not in docstore]
+            if new:
+                self.vector_store.add_embeddings(
+                    [(record['texts'][i], record['vectors'][i]) for i in new],
+                    metadatas=[record['metadatas'][i] for i in new],
+                    ids=[record['ids'][i] for i in new]
+                )
+        elif record['op'] == 'delete':
+            present = [doc_id for doc_id in record['ids'] if doc_id in docstore]
+            if present:
+                self.vector_store.delete(present)
+        else:
+            self.logger.warning(f"Ignoring segment with unknown operation: {record['op']}")
+
+    def _schedule_merge(self) -> None:
+        """Fold segments into a new base snapshot in the background once enough have accumulated."""
+        if self.segment_log.pending_segment_count() < Config.SEGMENT_MERGE_THRESHOLD:
+            return
+        with self._lock:
+            if self._merge_thread and self._merge_thread.is_alive():
+                return
+            self._merge_thread = threading.Thread(
+                target=self.persist_vector_store, name="segment-merge", daemon=True
+            )
+            self._merge_thread.start()
+
     def persist_vector_store(self) -> None:
-        """Save vector store to disk."""
+        """Save a full base snapshot to disk and drop the segments it covers."""
         try:
-            self.vector_store.save_local(Config.VECTOR_STORE_PATH)
+            with self._merge_lock:
+                # Copy under the store lock, write outside it so adds and searches are not blocked
+                with self._lock:
+                    sequence = self.segment_log.next_sequence - 1
+                    snapshot = FAISS(
+                        self.embedding_model,
+                        faiss.clone_index(self.vector_store.index),
+                        InMemoryDocstore(dict(self.vector_store.docstore._dict)),
+                        dict(self.vector_store.index_to_docstore_id),
+                        normalize_L2=self.vector_store._normalize_L2,
+                        distance_strategy=self.vector_store.distance_strategy
+                    )
+                self.segment_log.install_base(snapshot.save_local, sequence)
             self.logger.debug(f"Vector store saved to {Config.VECTOR_STORE_PATH}")
         except Exception as e:
             self.logger.error(f"Error saving vector store: {e}", exc_info=True)